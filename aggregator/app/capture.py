@@ -0,0 +1,139 @@
+"""Compact rotating capture files of raw MQTT traffic for offline replay.
+
+Each file starts with ``CAPTURE_MAGIC`` followed by records of::
+
+    float64 arrival_ts | uint16 topic_len | uint32 payload_len | topic | payload
+"""
+from __future__ import annotations
+
+import logging
+import queue
+import struct
+import threading
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import BinaryIO, Iterable, Iterator
+
+logger = logging.getLogger(__name__)
+
+CAPTURE_MAGIC = b"CPCAP1\n"
+CAPTURE_SUFFIX = ".cap"
+_RECORD = struct.Struct(">dHI")
+
+
+class CaptureWriter:
+    """Appends raw messages to `directory`, rotating by size and keeping the newest files.
+
+    `write` only enqueues; a background thread does the file I/O, so a flood
+    costs the event loop a queue put. Records beyond `max_pending` are dropped
+    and counted rather than buffered.
+    """
+
+    def __init__(
+        self,
+        directory: str | Path,
+        *,
+        max_bytes: int = 64 * 1024 * 1024,
+        max_files: int = 10,
+        max_pending: int = 10_000,
+    ) -> None:
+        self._directory = Path(directory)
+        self._max_bytes = max_bytes
+        self._max_files = max(1, max_files)
+        self._file: BinaryIO | None = None
+        self._written = 0
+        self._queue: queue.Queue[tuple[float, str, bytes] | None] = queue.Queue(maxsize=max(1, max_pending))
+        self._thread: threading.Thread | None = None
+        self.records = 0
+        self.dropped = 0
+
+    def _open(self) -> BinaryIO:
+        self._directory.mkdir(parents=True, exist_ok=True)
+        stamp = datetime.now(timezone.utc).strftime("%Y%m%dT%H%M%S%f")
+        path = self._directory / f"capture-{stamp}{CAPTURE_SUFFIX}"
+        handle = path.open("wb")
+        handle.write(CAPTURE_MAGIC)
+        self._written = len(CAPTURE_MAGIC)
+        logger.info("Recording MQTT traffic to %s", path)
+        self._prune()
+        return handle
+
+    def _prune(self) -> None:
+        files = sorted(self._directory.glob(f"capture-*{CAPTURE_SUFFIX}"))
+        for stale in files[: max(0, len(files) - self._max_files)]:
+            stale.unlink(missing_ok=True)
+
+    def write(self, arrival_ts: float, topic: str, payload: bytes) -> None:
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._run, name="mqtt-capture", daemon=True)
+            self._thread.start()
+        try:
+            self._queue.put_nowait((arrival_ts, topic, payload))
+        except queue.Full:
+            self.dropped += 1
+
+    def _run(self) -> None:
+        while True:
+            item = self._queue.get()
+            if item is None:
+                break
+            try:
+                self._write_record(*item)
+            except OSError as exc:
+                self.dropped += 1
+                logger.warning("Failed to write MQTT capture record: %s", exc)
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+
+    def _write_record(self, arrival_ts: float, topic: str, payload: bytes) -> None:
+        if self._file is None:
+            self._file = self._open()
+        topic_raw = topic.encode("utf-8")
+        record = _RECORD.pack(arrival_ts, len(topic_raw), len(payload)) + topic_raw + payload
+        self._file.write(record)
+        self._written += len(record)
+        self.records += 1
+        if self._written >= self._max_bytes:
+            self._file.close()
+            self._file = None
+
+    def stats(self) -> dict[str, int]:
+        return {"records": self.records, "dropped": self.dropped, "pending": self._queue.qsize()}
+
+    def close(self) -> None:
+        """Flush queued records and stop the writer thread."""
+
+        if self._thread is not None:
+            self._queue.put(None)
+            self._thread.join()
+            self._thread = None
+
+
+def capture_files(paths: Iterable[str | Path]) -> list[Path]:
+    """Expand directories into their capture files, oldest first."""
+
+    result: list[Path] = []
+    for raw in paths:
+        path = Path(raw)
+        if path.is_dir():
+            result.extend(sorted(path.glob(f"capture-*{CAPTURE_SUFFIX}")))
+        else:
+            result.append(path)
+    return result
+
+
+def iter_capture(path: str | Path) -> Iterator[tuple[float, str, bytes]]:
+    with Path(path).open("rb") as handle:
+        if handle.read(len(CAPTURE_MAGIC)) != CAPTURE_MAGIC:
+            raise ValueError(f"{path} is not a capture file")
+        while True:
+            header = handle.read(_RECORD.size)
+            if len(header) < _RECORD.size:
+                # A partial trailing record means the writer was killed mid-write.
+                return
+            arrival_ts, topic_len, payload_len = _RECORD.unpack(header)
+            body = handle.read(topic_len + payload_len)
+            if len(body) < topic_len + payload_len:
+                return
+            yield arrival_ts, body[:topic_len].decode("utf-8", errors="replace"), body[topic_len:]
@@ -0,0 +1,374 @@
+"""Columnar block codec for (timestamp, value) series.
+
+Timestamps (integer milliseconds) are stored as zig-zag delta-of-delta in
+variable-width buckets and values as Gorilla-style XOR against the previous
+float, so slowly changing greenhouse readings cost a few bits per point.
+
+Block layout::
+
+    uint16 count | int64 first_ts_ms | uint64 first_value_bits | bitstream
+
+Export stream layout (``application/octet-stream``)::
+
+    b"CPGZ" | uint8 version | uint16 len + site | frame*
+    frame: uint16 len + device_id | uint16 len + metric | uint32 blocks | (uint32 len + block)*
+"""
+from __future__ import annotations
+
+import struct
+from collections import deque
+from datetime import datetime
+from typing import Any, Iterable, Iterator, Sequence
+
+BLOCK_SIZE = 1024
+STREAM_MAGIC = b"CPGZ"
+STREAM_VERSION = 2
+
+_BLOCK_HEADER = struct.Struct(">HqQ")
+_FLOAT = struct.Struct(">d")
+_UINT64 = struct.Struct(">Q")
+_U16 = struct.Struct(">H")
+_U32 = struct.Struct(">I")
+
+# (control bits, control width, payload width) for delta-of-delta buckets.
+_DOD_BUCKETS: tuple[tuple[int, int, int], ...] = (
+    (0b10, 2, 7),
+    (0b110, 3, 9),
+    (0b1110, 4, 12),
+    (0b11110, 5, 32),
+    (0b11111, 5, 64),
+)
+
+
+class CodecError(ValueError):
+    """Raised when a block or export stream cannot be decoded."""
+
+
+def _float_bits(value: float) -> int:
+    return _UINT64.unpack(_FLOAT.pack(value))[0]
+
+
+def _bits_float(bits: int) -> float:
+    return _FLOAT.unpack(_UINT64.pack(bits))[0]
+
+
+def _zigzag(value: int) -> int:
+    return value << 1 if value >= 0 else ((-value) << 1) - 1
+
+
+def _unzigzag(value: int) -> int:
+    return value >> 1 if not value & 1 else -((value + 1) >> 1)
+
+
+class _BitWriter:
+    __slots__ = ("_out", "_acc", "_bits")
+
+    def __init__(self) -> None:
+        self._out = bytearray()
+        self._acc = 0
+        self._bits = 0
+
+    def write(self, value: int, width: int) -> None:
+        self._acc = (self._acc << width) | value
+        self._bits += width
+        if self._bits >= 64:
+            spill = self._bits - (self._bits % 8)
+            rest = self._bits - spill
+            self._out += (self._acc >> rest).to_bytes(spill // 8, "big")
+            self._acc &= (1 << rest) - 1
+            self._bits = rest
+
+    def getvalue(self) -> bytes:
+        if self._bits:
+            pad = -self._bits % 8
+            self._out += (self._acc << pad).to_bytes((self._bits + pad) // 8, "big")
+            self._acc = 0
+            self._bits = 0
+        return bytes(self._out)
+
+
+class _BitReader:
+    __slots__ = ("_data", "_pos", "_acc", "_bits")
+
+    def __init__(self, data: bytes) -> None:
+        self._data = data
+        self._pos = 0
+        self._acc = 0
+        self._bits = 0
+
+    def read(self, width: int) -> int:
+        while self._bits < width:
+            chunk = self._data[self._pos:self._pos + 8]
+            if not chunk:
+                raise CodecError("Truncated block")
+            self._pos += len(chunk)
+            self._acc = (self._acc << (8 * len(chunk))) | int.from_bytes(chunk, "big")
+            self._bits += 8 * len(chunk)
+        self._bits -= width
+        value = self._acc >> self._bits
+        self._acc &= (1 << self._bits) - 1
+        return value
+
+
+def encode_block(timestamps: Sequence[int], values: Sequence[float]) -> bytes:
+    """Encode up to `BLOCK_SIZE` points; timestamps are integer milliseconds."""
+
+    count = len(timestamps)
+    if count != len(values):
+        raise ValueError("timestamps and values must have the same length")
+    if count == 0 or count > 0xFFFF:
+        raise ValueError(f"Block must hold between 1 and {0xFFFF} points")
+
+    first_bits = _float_bits(values[0])
+    header = _BLOCK_HEADER.pack(count, timestamps[0], first_bits)
+    writer = _BitWriter()
+    write = writer.write
+
+    prev_ts = timestamps[0]
+    prev_delta = 0
+    prev_bits = first_bits
+    prev_leading = -1
+    prev_trailing = 0
+    for index in range(1, count):
+        ts = timestamps[index]
+        delta = ts - prev_ts
+        dod = _zigzag(delta - prev_delta)
+        prev_ts = ts
+        prev_delta = delta
+        if dod == 0:
+            write(0, 1)
+        else:
+            for control, control_width, width in _DOD_BUCKETS:
+                if dod < (1 << width):
+                    write(control, control_width)
+                    write(dod, width)
+                    break
+            else:
+                raise ValueError(f"Timestamp jump at index {index} does not fit in 64 bits")
+
+        bits = _float_bits(values[index])
+        xor = bits ^ prev_bits
+        prev_bits = bits
+        if xor == 0:
+            write(0, 1)
+            continue
+        leading = min(64 - xor.bit_length(), 31)
+        trailing = (xor & -xor).bit_length() - 1
+        if prev_leading >= 0 and leading >= prev_leading and trailing >= prev_trailing:
+            meaningful = 64 - prev_leading - prev_trailing
+            write(0b10, 2)
+            write(xor >> prev_trailing, meaningful)
+        else:
+            meaningful = 64 - leading - trailing
+            write(0b11, 2)
+            write(leading, 5)
+            write(meaningful - 1, 6)
+            write(xor >> trailing, meaningful)
+            prev_leading = leading
+            prev_trailing = trailing
+    return header + writer.getvalue()
+
+
+def decode_block(block: bytes) -> tuple[list[int], list[float]]:
+    if len(block) < _BLOCK_HEADER.size:
+        raise CodecError("Block shorter than header")
+    count, first_ts, first_bits = _BLOCK_HEADER.unpack_from(block)
+    reader = _BitReader(block[_BLOCK_HEADER.size:])
+    read = reader.read
+
+    timestamps = [first_ts]
+    values = [_bits_float(first_bits)]
+    prev_ts = first_ts
+    prev_delta = 0
+    prev_bits = first_bits
+    prev_leading = -1
+    prev_trailing = 0
+    for _ in range(1, count):
+        if read(1):
+            # The number of leading one bits (capped at 5) selects the bucket.
+            ones = 1
+            while ones < len(_DOD_BUCKETS) and read(1):
+                ones += 1
+            prev_delta += _unzigzag(read(_DOD_BUCKETS[ones - 1][2]))
+        prev_ts += prev_delta
+        timestamps.append(prev_ts)
+
+        if read(1):
+            if read(1):
+                prev_leading = read(5)
+                meaningful = read(6) + 1
+                prev_trailing = 64 - prev_leading - meaningful
+            elif prev_leading < 0:
+                raise CodecError("XOR window reused before it was set")
+            else:
+                meaningful = 64 - prev_leading - prev_trailing
+            prev_bits ^= read(meaningful) << prev_trailing
+        values.append(_bits_float(prev_bits))
+    return timestamps, values
+
+
+def encode_series(
+    timestamps: Sequence[int], values: Sequence[float], *, block_size: int = BLOCK_SIZE
+) -> list[bytes]:
+    return [
+        encode_block(timestamps[start:start + block_size], values[start:start + block_size])
+        for start in range(0, len(timestamps), block_size)
+    ]
+
+
+def stream_header(site: str) -> bytes:
+    site_raw = site.encode("utf-8")
+    return STREAM_MAGIC + bytes([STREAM_VERSION]) + _U16.pack(len(site_raw)) + site_raw
+
+
+def encode_frame(device_id: str, metric: str, blocks: Sequence[bytes]) -> bytes:
+    device_raw = device_id.encode("utf-8")
+    metric_raw = metric.encode("utf-8")
+    parts = [
+        _U16.pack(len(device_raw)),
+        device_raw,
+        _U16.pack(len(metric_raw)),
+        metric_raw,
+        _U32.pack(len(blocks)),
+    ]
+    for block in blocks:
+        parts.append(_U32.pack(len(block)))
+        parts.append(block)
+    return b"".join(parts)
+
+
+def read_stream_site(data: bytes) -> str:
+    prefix = STREAM_MAGIC + bytes([STREAM_VERSION])
+    if data[: len(prefix)] != prefix:
+        raise CodecError(f"Not a CPGZ v{STREAM_VERSION} stream")
+    try:
+        (length,) = _U16.unpack_from(data, len(prefix))
+    except struct.error as exc:
+        raise CodecError(f"Truncated stream: {exc}") from exc
+    return data[len(prefix) + 2:len(prefix) + 2 + length].decode("utf-8")
+
+
+def iter_frames(data: bytes) -> Iterator[tuple[str, str, list[int], list[float]]]:
+    """Decode an export stream into (device_id, metric, timestamps_ms, values) per series."""
+
+    offset = len(stream_header(read_stream_site(data)))
+    view = memoryview(data)
+    try:
+        while offset < len(data):
+            (length,) = _U16.unpack_from(view, offset)
+            device_id = bytes(view[offset + 2:offset + 2 + length]).decode("utf-8")
+            offset += 2 + length
+            (length,) = _U16.unpack_from(view, offset)
+            metric = bytes(view[offset + 2:offset + 2 + length]).decode("utf-8")
+            offset += 2 + length
+            (block_count,) = _U32.unpack_from(view, offset)
+            offset += 4
+            timestamps: list[int] = []
+            values: list[float] = []
+            for _ in range(block_count):
+                (length,) = _U32.unpack_from(view, offset)
+                block_ts, block_values = decode_block(bytes(view[offset + 4:offset + 4 + length]))
+                timestamps.extend(block_ts)
+                values.extend(block_values)
+                offset += 4 + length
+            yield device_id, metric, timestamps, values
+    except struct.error as exc:
+        raise CodecError(f"Truncated stream: {exc}") from exc
+
+
+def encode_rows(rows: Iterable[dict[str, Any]], *, site: str, block_size: int = BLOCK_SIZE) -> bytes:
+    """Encode one site's rows ordered by (device_id, metric, ts) into an export stream."""
+
+    parts = [stream_header(site)]
+    key: tuple[str, str] | None = None
+    timestamps: list[int] = []
+    values: list[float] = []
+    for row in rows:
+        row_key = (row["device_id"], row["metric"])
+        if row_key != key:
+            if key is not None:
+                parts.append(encode_frame(*key, encode_series(timestamps, values, block_size=block_size)))
+            key = row_key
+            timestamps = []
+            values = []
+        timestamps.append(_to_millis(row["ts"]))
+        values.append(float(row["value"]))
+    if key is not None:
+        parts.append(encode_frame(*key, encode_series(timestamps, values, block_size=block_size)))
+    return b"".join(parts)
+
+
+def _to_millis(value: datetime | int | float) -> int:
+    if isinstance(value, datetime):
+        return round(value.timestamp() * 1000)
+    return int(value)
+
+
+class CompressedSeries:
+    """Append-only history: an uncompressed tail plus sealed compressed blocks."""
+
+    __slots__ = ("_block_size", "_blocks", "_tail_ts", "_tail_values")
+
+    def __init__(self, *, block_size: int = BLOCK_SIZE, max_blocks: int = 32) -> None:
+        self._block_size = block_size
+        self._blocks: deque[bytes] = deque(maxlen=max_blocks)
+        self._tail_ts: list[int] = []
+        self._tail_values: list[float] = []
+
+    def append(self, ts_ms: int, value: float) -> None:
+        self._tail_ts.append(ts_ms)
+        self._tail_values.append(value)
+        if len(self._tail_ts) >= self._block_size:
+            self._blocks.append(encode_block(self._tail_ts, self._tail_values))
+            self._tail_ts = []
+            self._tail_values = []
+
+    def blocks(self) -> list[bytes]:
+        blocks = list(self._blocks)
+        if self._tail_ts:
+            blocks.append(encode_block(self._tail_ts, self._tail_values))
+        return blocks
+
+    @property
+    def nbytes(self) -> int:
+        return sum(len(block) for block in self._blocks) + 16 * len(self._tail_ts)
+
+    def __len__(self) -> int:
+        # Sealed blocks are always full, so no decoding is needed to count points.
+        return len(self._blocks) * self._block_size + len(self._tail_ts)
+
+
+class HistoryStore:
+    """Compressed in-memory history per (site, device_id, metric), fed on every ingest."""
+
+    def __init__(self, *, block_size: int = BLOCK_SIZE, max_blocks: int = 32) -> None:
+        self._block_size = block_size
+        self._max_blocks = max_blocks
+        self._series: dict[tuple[str, str, str], CompressedSeries] = {}
+
+    def update(self, row: dict[str, Any]) -> None:
+        key = (row["site"], row["device_id"], row["metric"])
+        series = self._series.get(key)
+        if series is None:
+            series = CompressedSeries(block_size=self._block_size, max_blocks=self._max_blocks)
+            self._series[key] = series
+        series.append(_to_millis(row["ts"]), float(row["value"]))
+
+    def export(self, *, site: str, device_id: str | None = None, metric: str | None = None) -> bytes:
+        parts = [stream_header(site)]
+        for (series_site, series_device, series_metric), series in sorted(self._series.items()):
+            if series_site != site:
+                continue
+            if device_id is not None and series_device != device_id:
+                continue
+            if metric is not None and series_metric != metric:
+                continue
+            parts.append(encode_frame(series_device, series_metric, series.blocks()))
+        return b"".join(parts)
+
+    def stats(self) -> dict[str, int]:
+        return {
+            "series": len(self._series),
+            "points": sum(len(series) for series in self._series.values()),
+            "bytes": sum(series.nbytes for series in self._series.values()),
+        }
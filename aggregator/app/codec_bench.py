@@ -0,0 +1,139 @@
+"""Round-trip check and benchmark of `app.codec` against the JSON `/measurements` payload.
+
+Run with ``python -m app.codec_bench [points_per_series]``. The synthetic data
+mimics the greenhouse feeds: cron-driven readings roughly once a minute with
+a few seconds of jitter, temperatures rounded to 0.1C, and a 0/1 window state.
+Exits non-zero if any series fails to decode to exactly what was encoded.
+"""
+
+from __future__ import annotations
+
+import json
+import math
+import random
+import struct
+import sys
+import time
+from datetime import datetime, timezone
+
+from .codec import encode_rows, iter_frames
+
+SERIES = (
+    ("window-sensor", "temperature_inside"),
+    ("window-sensor", "temperature_outside"),
+    ("weather-service", "temperature_outside_ambient"),
+    ("window-actuator", "window_closed"),
+)
+
+
+def build_rows(points: int, seed: int = 7) -> list[dict]:
+    rng = random.Random(seed)
+    start_ms = 1_764_000_000_000
+    rows: list[dict] = []
+    row_id = 0
+    for device_id, metric in SERIES:
+        ts = start_ms
+        closed = 1.0
+        for index in range(points):
+            ts += 60_000 + rng.randint(-2_000, 2_000)
+            if metric == "window_closed":
+                if rng.random() < 0.02:
+                    closed = 1.0 - closed
+                value = closed
+            else:
+                base = 21.0 if metric == "temperature_inside" else 4.0
+                value = round(base + 3 * math.sin(index / 240) + rng.gauss(0, 0.15), 1)
+            row_id += 1
+            rows.append(
+                {
+                    "id": row_id,
+                    "device_id": device_id,
+                    "metric": metric,
+                    "value": value,
+                    "ts": ts,
+                    "payload": {"topic": metric, "unit": "C", "raw": str(value)},
+                }
+            )
+    return rows
+
+
+def _json_payload(rows: list[dict], *, with_payload: bool) -> bytes:
+    body = []
+    for row in rows:
+        item = {
+            "id": row["id"],
+            "device_id": row["device_id"],
+            "metric": row["metric"],
+            "value": row["value"],
+            "ts": datetime.fromtimestamp(row["ts"] / 1000, timezone.utc).isoformat(),
+        }
+        if with_payload:
+            item["payload"] = row["payload"]
+        body.append(item)
+    return json.dumps(body).encode("utf-8")
+
+
+def _timed(func, repeat: int = 3) -> tuple[float, object]:
+    best = math.inf
+    result = None
+    for _ in range(repeat):
+        started = time.perf_counter()
+        result = func()
+        best = min(best, time.perf_counter() - started)
+    return best, result
+
+
+def verify_round_trip(rows: list[dict]) -> bool:
+    expected: dict[tuple[str, str], tuple[list[int], list[float]]] = {}
+    for row in rows:
+        ts, values = expected.setdefault((row["device_id"], row["metric"]), ([], []))
+        ts.append(row["ts"])
+        values.append(row["value"])
+
+    ok = True
+    decoded = {
+        (device_id, metric): (ts, values)
+        for device_id, metric, ts, values in iter_frames(encode_rows(rows, site="bench"))
+    }
+    if decoded.keys() != expected.keys():
+        print("round-trip: series set differs")
+        return False
+    for key, (ts, values) in expected.items():
+        got_ts, got_values = decoded[key]
+        same_bits = [struct.pack(">d", v) for v in got_values] == [struct.pack(">d", v) for v in values]
+        if got_ts != ts or not same_bits:
+            print(f"round-trip: mismatch for {key}")
+            ok = False
+    return ok
+
+
+def main(points: int = 10_000) -> int:
+    rows = build_rows(points)
+    total = len(rows)
+    if not verify_round_trip(rows):
+        return 1
+    print(f"round-trip OK for {len(SERIES)} series x {points} points")
+
+    encode_seconds, encoded = _timed(lambda: encode_rows(rows, site="bench"))
+    decode_seconds, _ = _timed(lambda: list(iter_frames(encoded)))
+    json_full_seconds, json_full = _timed(lambda: _json_payload(rows, with_payload=True))
+    json_bare = _json_payload(rows, with_payload=False)
+    json_decode_seconds, _ = _timed(lambda: json.loads(json_full))
+
+    print(f"{'format':<28}{'bytes/point':>12}{'encode pts/s':>16}{'decode pts/s':>16}")
+    print(
+        f"{'cpgz (codec)':<28}{len(encoded) / total:>12.2f}"
+        f"{total / encode_seconds:>16,.0f}{total / decode_seconds:>16,.0f}"
+    )
+    print(
+        f"{'json /measurements':<28}{len(json_full) / total:>12.2f}"
+        f"{total / json_full_seconds:>16,.0f}{total / json_decode_seconds:>16,.0f}"
+    )
+    print(f"{'json without payload':<28}{len(json_bare) / total:>12.2f}{'':>16}{'':>16}")
+    print(f"{'raw int64 + float64':<28}{16:>12.2f}{'':>16}{'':>16}")
+    print(f"compression vs JSON /measurements: {len(json_full) / len(encoded):.1f}x")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main(int(sys.argv[1]) if len(sys.argv) > 1 else 10_000))
@@ -19,10 +19,30 @@ class Settings(BaseSettings):
     outside_temperature_user_agent: str = "cieplarnia-aggregator"
     window_state_topic: str = "okno/stan"
     window_command_topic: str = "okno/zamknij"
+    # Multi-site routing is opt-in: "cieplarnia/..." is already the single-site namespace.
+    site_topic_prefix: str = ""
+    default_site: str = "default"
+    sites: str = ""
     api_host: str = "0.0.0.0"
     api_port: int = 8000
     allowed_origins: str = "http://localhost:3000"
     healthcheck_topic: str = "$SYS/broker/version"
+    log_level: str = "INFO"
+    log_json: bool = True
+    ingest_device_rate: float = 5.0
+    ingest_device_burst: float = 20.0
+    ingest_topic_rate: float = 50.0
+    ingest_topic_burst: float = 200.0
+    ingest_global_rate: float = 200.0
+    ingest_global_burst: float = 500.0
+    ingest_max_series: int = 500
+    ingest_series_idle_seconds: float = 900.0
+    ingest_write_queue_size: int = 1000
+    ingest_writers: int = 2
+    history_max_blocks: int = 32
+    capture_dir: str | None = None
+    capture_max_bytes: int = 64 * 1024 * 1024
+    capture_max_files: int = 10
 
     class Config:
         env_prefix = ""
@@ -32,6 +52,10 @@ class Settings(BaseSettings):
     def cors_origins(self) -> list[str]:
         return [origin.strip() for origin in self.allowed_origins.split(",") if origin.strip()]
 
+    @property
+    def site_list(self) -> list[str]:
+        return [site.strip() for site in self.sites.split(",") if site.strip()]
+
 
 @lru_cache
 def get_settings() -> Settings:
@@ -1,28 +1,53 @@
 import json
-from typing import Any
+from datetime import datetime, timedelta
+from typing import Any, Awaitable, Callable, Literal
 
 import asyncpg
 
+from .message_parser import DEFAULT_SITE, is_valid_site
+
 
 class Database:
-    def __init__(self, dsn: str):
+    def __init__(
+        self,
+        dsn: str,
+        *,
+        on_connect: Callable[[asyncpg.Connection], Awaitable[None]] | None = None,
+        default_site: str = DEFAULT_SITE,
+    ):
+        # Interpolated into the schema DDL below, so it must be a plain site name.
+        if not is_valid_site(default_site):
+            raise ValueError(f"Invalid default site {default_site!r}")
         self._dsn = dsn
+        self._default_site = default_site
+        self._on_connect = on_connect
         self._pool: asyncpg.Pool | None = None
+        self._schema_ready = False
+
+    @property
+    def ready(self) -> bool:
+        return self._pool is not None and self._schema_ready
 
     async def connect(self) -> None:
         if self._pool is None:
-            self._pool = await asyncpg.create_pool(self._dsn, min_size=1, max_size=5)
+            self._pool = await asyncpg.create_pool(self._dsn, min_size=1, max_size=5, init=self._on_connect)
+
+    async def ensure_schema(self) -> None:
+        if not self._schema_ready:
             await self._create_schema()
+            self._schema_ready = True
 
     async def disconnect(self) -> None:
         if self._pool is not None:
             await self._pool.close()
             self._pool = None
+        self._schema_ready = False
 
     async def _create_schema(self) -> None:
         if self._pool is None:
-            return
+            raise RuntimeError("Database pool not initialized")
         async with self._pool.acquire() as conn:
+            await conn.execute("CREATE EXTENSION IF NOT EXISTS timescaledb;")
             await conn.execute(
                 """
                 CREATE TABLE IF NOT EXISTS measurements (
@@ -41,28 +66,61 @@ class Database:
                 ON measurements (device_id, ts DESC);
                 """
             )
+            # Every read path filters on site first, so it leads both site indexes.
+            await conn.execute(
+                f"""
+                ALTER TABLE measurements
+                ADD COLUMN IF NOT EXISTS site TEXT NOT NULL DEFAULT '{self._default_site}';
+                """
+            )
+            await conn.execute(
+                """
+                CREATE INDEX IF NOT EXISTS idx_measurements_site_ts
+                ON measurements (site, ts DESC);
+                """
+            )
+            await conn.execute(
+                """
+                CREATE INDEX IF NOT EXISTS idx_measurements_site_series_ts
+                ON measurements (site, device_id, metric, ts DESC);
+                """
+            )
 
-    async def insert_measurement(self, device_id: str, metric: str, value: float, payload: dict | None) -> None:
+    async def insert_measurement(
+        self, device_id: str, metric: str, value: float, payload: dict | None, site: str | None = None
+    ) -> dict[str, Any]:
         if self._pool is None:
             raise RuntimeError("Database pool not initialized")
+        site = site or self._default_site
         payload_json = json.dumps(payload) if payload is not None else None
         async with self._pool.acquire() as conn:
-            await conn.execute(
+            row = await conn.fetchrow(
                 """
-                INSERT INTO measurements (device_id, metric, value, payload)
-                VALUES ($1, $2, $3, $4)
+                INSERT INTO measurements (site, device_id, metric, value, payload)
+                VALUES ($1, $2, $3, $4, $5)
+                RETURNING id, ts
                 """,
+                site,
                 device_id,
                 metric,
                 value,
                 payload_json,
             )
+        return {
+            "id": row["id"],
+            "site": site,
+            "device_id": device_id,
+            "metric": metric,
+            "value": value,
+            "ts": row["ts"],
+            "payload": payload,
+        }
 
-    async def fetch_recent(self, *, limit: int | None = 100, hours: int | None = None):
+    async def fetch_recent(self, *, site: str, limit: int | None = 100, hours: int | None = None):
         if self._pool is None:
             raise RuntimeError("Database pool not initialized")
-        clauses: list[str] = []
-        params: list[Any] = []
+        clauses: list[str] = ["site = $1"]
+        params: list[Any] = [site]
         if hours is not None and hours > 0:
             clauses.append(
                 f"ts >= NOW() - (${len(params) + 1}::int || ' hours')::interval"
@@ -70,12 +128,11 @@ class Database:
             params.append(hours)
 
         query = [
-            "SELECT id, device_id, metric, value, ts, payload",
+            "SELECT id, site, device_id, metric, value, ts, payload",
             "FROM measurements",
+            "WHERE " + " AND ".join(clauses),
+            "ORDER BY ts DESC",
         ]
-        if clauses:
-            query.append("WHERE " + " AND ".join(clauses))
-        query.append("ORDER BY ts DESC")
         if limit is not None and limit > 0:
             query.append(f"LIMIT ${len(params) + 1}")
             params.append(limit)
@@ -83,37 +140,174 @@ class Database:
         sql = "\n".join(query)
         async with self._pool.acquire() as conn:
             rows = await conn.fetch(sql, *params)
-        normalized = []
-        for row in rows:
-            row_dict = dict(row)
-            payload = row_dict.get("payload")
-            if isinstance(payload, str):
-                try:
-                    row_dict["payload"] = json.loads(payload)
-                except json.JSONDecodeError:
-                    row_dict["payload"] = None
-            normalized.append(row_dict)
-        return normalized
-
-    async def fetch_latest(self, device_id: str, metric: str) -> dict[str, Any] | None:
+        return [_decode_row(row) for row in rows]
+
+    async def fetch_latest(self, device_id: str, metric: str, *, site: str) -> dict[str, Any] | None:
         if self._pool is None:
             raise RuntimeError("Database pool not initialized")
         query = """
-            SELECT id, device_id, metric, value, ts, payload
+            SELECT id, site, device_id, metric, value, ts, payload
             FROM measurements
-            WHERE device_id = $1 AND metric = $2
+            WHERE site = $1 AND device_id = $2 AND metric = $3
             ORDER BY ts DESC
             LIMIT 1
         """
         async with self._pool.acquire() as conn:
-            row = await conn.fetchrow(query, device_id, metric)
+            row = await conn.fetchrow(query, site, device_id, metric)
         if row is None:
             return None
-        row_dict = dict(row)
-        payload = row_dict.get("payload")
-        if isinstance(payload, str):
-            try:
-                row_dict["payload"] = json.loads(payload)
-            except json.JSONDecodeError:
-                row_dict["payload"] = None
-        return row_dict
+        return _decode_row(row)
+
+    async def fetch_latest_per_series(self) -> list[dict[str, Any]]:
+        """Newest row for every (site, device_id, metric); used to warm the latest-value caches."""
+
+        if self._pool is None:
+            raise RuntimeError("Database pool not initialized")
+        query = """
+            SELECT DISTINCT ON (site, device_id, metric) id, site, device_id, metric, value, ts, payload
+            FROM measurements
+            WHERE ts >= NOW() - INTERVAL '7 days'
+            ORDER BY site, device_id, metric, ts DESC
+        """
+        async with self._pool.acquire() as conn:
+            rows = await conn.fetch(query)
+        return [_decode_row(row) for row in rows]
+
+    async def fetch_aligned(
+        self,
+        series: list[tuple[str, str]],
+        *,
+        site: str,
+        bucket: timedelta,
+        start: datetime,
+        end: datetime,
+        fill: Literal["none", "locf", "interpolate"] = "locf",
+    ) -> dict[str, Any]:
+        """Bucket several series onto one time axis with TimescaleDB gapfill.
+
+        Returns a columnar matrix: a shared list of bucket timestamps plus one
+        value list per requested series (``None`` where nothing could be filled).
+        """
+
+        if self._pool is None:
+            raise RuntimeError("Database pool not initialized")
+        # Seed the fill from the last reading before the window (and, for interpolate, the
+        # first one after it) so sparse series do not start or end with an artificial gap.
+        neighbour = """(
+                SELECT {columns} FROM measurements n
+                WHERE n.site = $6 AND n.device_id = r.device_id AND n.metric = r.metric AND n.ts {condition}
+                ORDER BY n.ts {order} LIMIT 1
+            )"""
+        prev_value = neighbour.format(columns="n.value", condition="< $4", order="DESC")
+        prev_point = neighbour.format(columns="(n.ts, n.value)", condition="< $4", order="DESC")
+        next_point = neighbour.format(columns="(n.ts, n.value)", condition=">= $5", order="ASC")
+        aggregate = {
+            "none": "avg(m.value)",
+            "locf": f"locf(avg(m.value), prev => {prev_value})",
+            "interpolate": f"interpolate(avg(m.value), prev => {prev_point}, next => {next_point})",
+        }[fill]
+        query = f"""
+            WITH requested AS (
+                SELECT device_id, metric, idx
+                FROM unnest($1::text[], $2::text[]) WITH ORDINALITY AS r(device_id, metric, idx)
+            )
+            SELECT time_bucket_gapfill($3::interval, m.ts, $4::timestamptz, $5::timestamptz) AS bucket,
+                   r.idx,
+                   {aggregate} AS value
+            FROM measurements m
+            JOIN requested r ON r.device_id = m.device_id AND r.metric = m.metric
+            WHERE m.site = $6 AND m.ts >= $4 AND m.ts < $5
+            GROUP BY bucket, r.idx, r.device_id, r.metric
+            ORDER BY bucket, r.idx
+        """
+        device_ids = [device_id for device_id, _ in series]
+        metrics = [metric for _, metric in series]
+        async with self._pool.acquire() as conn:
+            rows = await conn.fetch(query, device_ids, metrics, bucket, start, end, site)
+
+        buckets: list[datetime] = []
+        positions: dict[datetime, int] = {}
+        for row in rows:
+            if row["bucket"] not in positions:
+                positions[row["bucket"]] = len(buckets)
+                buckets.append(row["bucket"])
+        values: list[list[float | None]] = [[None] * len(buckets) for _ in series]
+        for row in rows:
+            values[row["idx"] - 1][positions[row["bucket"]]] = row["value"]
+        return {
+            "buckets": buckets,
+            "series": [
+                {"device_id": device_id, "metric": metric, "values": column}
+                for (device_id, metric), column in zip(series, values)
+            ],
+        }
+
+    async def fetch_rollups(
+        self, *, hours: int = 24, bucket: timedelta = timedelta(minutes=1)
+    ) -> tuple[datetime, list[dict[str, Any]]]:
+        """Per-series time buckets with count/mean/M2/min/max/last, oldest first.
+
+        Also returns the cutoff: rows with `ts` at or after it are not part of the
+        rollups, so a caller can apply those from its own stream without double counting.
+        """
+
+        if self._pool is None:
+            raise RuntimeError("Database pool not initialized")
+        query = """
+            SELECT site,
+                   device_id,
+                   metric,
+                   time_bucket($1::interval, ts) AS bucket,
+                   count(*) AS count,
+                   avg(value) AS mean,
+                   coalesce(var_pop(value), 0) * count(*) AS m2,
+                   min(value) AS min,
+                   max(value) AS max,
+                   last(value, ts) AS last
+            FROM measurements
+            WHERE ts >= $3::timestamptz - ($2::int || ' hours')::interval
+              AND ts < $3::timestamptz
+            GROUP BY site, device_id, metric, bucket
+            ORDER BY bucket
+        """
+        async with self._pool.acquire() as conn:
+            # One snapshot for both statements, so now() matches what the rollup query sees.
+            async with conn.transaction(isolation="repeatable_read", readonly=True):
+                cutoff = await conn.fetchval("SELECT now()")
+                rows = await conn.fetch(query, bucket, hours, cutoff)
+        return cutoff, [dict(row) for row in rows]
+
+    async def fetch_points(
+        self, *, site: str, hours: int, device_id: str | None = None, metric: str | None = None
+    ) -> list[dict[str, Any]]:
+        """Bare (device_id, metric, ts, value) rows of one site ordered per series, for the binary export."""
+
+        if self._pool is None:
+            raise RuntimeError("Database pool not initialized")
+        clauses = ["site = $1", "ts >= NOW() - ($2::int || ' hours')::interval"]
+        params: list[Any] = [site, hours]
+        if device_id is not None:
+            params.append(device_id)
+            clauses.append(f"device_id = ${len(params)}")
+        if metric is not None:
+            params.append(metric)
+            clauses.append(f"metric = ${len(params)}")
+        query = (
+            "SELECT device_id, metric, ts, value FROM measurements WHERE "
+            + " AND ".join(clauses)
+            + " ORDER BY device_id, metric, ts"
+        )
+        async with self._pool.acquire() as conn:
+            rows = await conn.fetch(query, *params)
+        return [dict(row) for row in rows]
+
+
+def _decode_row(row: asyncpg.Record) -> dict[str, Any]:
+    row_dict = dict(row)
+    payload = row_dict.get("payload")
+    if isinstance(payload, str):
+        try:
+            row_dict["payload"] = json.loads(payload)
+        except json.JSONDecodeError:
+            row_dict["payload"] = None
+    return row_dict
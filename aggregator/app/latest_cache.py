@@ -0,0 +1,37 @@
+"""In-memory cache of the most recent measurement per site and (device_id, metric)."""
+from __future__ import annotations
+
+from typing import Any
+
+
+class LatestValueCache:
+    """Holds the newest row per series, partitioned by site, so hot read endpoints skip the database."""
+
+    def __init__(self) -> None:
+        self._sites: dict[str, dict[tuple[str, str], dict[str, Any]]] = {}
+        self.warmed = False
+
+    def get(self, site: str, device_id: str, metric: str) -> dict[str, Any] | None:
+        rows = self._sites.get(site)
+        if rows is None:
+            return None
+        return rows.get((device_id, metric))
+
+    def update(self, row: dict[str, Any]) -> None:
+        rows = self._sites.setdefault(row["site"], {})
+        key = (row["device_id"], row["metric"])
+        current = rows.get(key)
+        if current is None or row["ts"] >= current["ts"]:
+            rows[key] = row
+
+    def warm(self, rows: list[dict[str, Any]]) -> None:
+        for row in rows:
+            self.update(row)
+        self.warmed = True
+
+    @property
+    def sites(self) -> list[str]:
+        return sorted(self._sites)
+
+    def __len__(self) -> int:
+        return sum(len(rows) for rows in self._sites.values())
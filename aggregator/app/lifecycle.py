@@ -0,0 +1,130 @@
+"""Staged startup bookkeeping: per-subsystem state, retry loop and cold-start timings."""
+from __future__ import annotations
+
+import asyncio
+import logging
+import time
+from dataclasses import dataclass
+from enum import Enum
+from typing import Any, Awaitable, Callable
+
+logger = logging.getLogger(__name__)
+
+# Captured at import so cold-start timings include module loading.
+_PROCESS_STARTED = time.monotonic()
+
+
+class SubsystemState(str, Enum):
+    PENDING = "pending"
+    STARTING = "starting"
+    RETRYING = "retrying"
+    READY = "ready"
+    DISABLED = "disabled"
+    STOPPED = "stopped"
+
+
+@dataclass(slots=True)
+class SubsystemStatus:
+    required: bool
+    state: SubsystemState = SubsystemState.PENDING
+    attempts: int = 0
+    last_error: str | None = None
+    ready_after: float | None = None
+
+
+class StartupTracker:
+    """Tracks background startup of the aggregator subsystems for `/ready`."""
+
+    def __init__(self) -> None:
+        self._subsystems: dict[str, SubsystemStatus] = {}
+        self._events: dict[str, asyncio.Event] = {}
+        self._first_message_after: float | None = None
+
+    @staticmethod
+    def elapsed() -> float:
+        return time.monotonic() - _PROCESS_STARTED
+
+    def register(self, name: str, *, required: bool = True, enabled: bool = True) -> None:
+        status = SubsystemStatus(required=required and enabled)
+        if not enabled:
+            status.state = SubsystemState.DISABLED
+        self._subsystems[name] = status
+        self._events[name] = asyncio.Event()
+
+    def mark(self, name: str, state: SubsystemState, error: str | None = None) -> None:
+        status = self._subsystems[name]
+        status.state = state
+        if state is SubsystemState.STARTING or state is SubsystemState.RETRYING:
+            status.attempts += 1
+        if error is not None:
+            status.last_error = error
+        if state is SubsystemState.READY:
+            status.last_error = None
+            if status.ready_after is None:
+                status.ready_after = round(self.elapsed(), 3)
+                logger.info("Subsystem %s ready after %.3fs", name, status.ready_after)
+            self._events[name].set()
+        elif state is SubsystemState.STOPPED:
+            self._events[name].clear()
+
+    def is_ready(self, name: str) -> bool:
+        return self._subsystems[name].state is SubsystemState.READY
+
+    async def wait_ready(self, name: str) -> None:
+        await self._events[name].wait()
+
+    def record_first_message(self) -> None:
+        if self._first_message_after is None:
+            self._first_message_after = round(self.elapsed(), 3)
+            logger.info("First measurement stored %.3fs after process start", self._first_message_after)
+
+    @property
+    def ready(self) -> bool:
+        return all(
+            status.state is SubsystemState.READY
+            for status in self._subsystems.values()
+            if status.required
+        )
+
+    def snapshot(self) -> dict[str, Any]:
+        return {
+            "ready": self.ready,
+            "uptime_seconds": round(self.elapsed(), 3),
+            "first_message_after_seconds": self._first_message_after,
+            "subsystems": {
+                name: {
+                    "state": status.state.value,
+                    "required": status.required,
+                    "attempts": status.attempts,
+                    "last_error": status.last_error,
+                    "ready_after_seconds": status.ready_after,
+                }
+                for name, status in self._subsystems.items()
+            },
+        }
+
+    async def run_with_retry(
+        self,
+        name: str,
+        step: Callable[[], Awaitable[None]],
+        *,
+        initial_delay: float = 1.0,
+        max_delay: float = 30.0,
+    ) -> None:
+        """Run `step` until it succeeds, backing off exponentially between attempts."""
+
+        delay = initial_delay
+        self.mark(name, SubsystemState.STARTING)
+        while True:
+            try:
+                await step()
+            except asyncio.CancelledError:
+                raise
+            except Exception as exc:
+                self.mark(name, SubsystemState.RETRYING, error=str(exc) or type(exc).__name__)
+                logger.warning("Subsystem %s failed to start (%s), retrying in %.1fs", name, exc, delay)
+                await asyncio.sleep(delay)
+                delay = min(delay * 2, max_delay)
+                continue
+            self.mark(name, SubsystemState.READY)
+            return
@@ -0,0 +1,111 @@
+"""Non-blocking logging: records are queued on the event loop and written by a listener thread."""
+from __future__ import annotations
+
+import atexit
+import logging
+import logging.handlers
+import queue
+import sys
+import time
+from collections import OrderedDict
+from typing import Hashable
+
+_listener: logging.handlers.QueueListener | None = None
+
+
+def configure_logging(level: str = "INFO", *, json_format: bool = True) -> None:
+    """Route the root logger through a QueueHandler; stdout I/O happens in a QueueListener thread."""
+
+    global _listener
+    if _listener is not None:
+        return
+
+    stream_handler = logging.StreamHandler(sys.stdout)
+    if json_format:
+        from pythonjsonlogger import jsonlogger
+
+        stream_handler.setFormatter(jsonlogger.JsonFormatter("%(asctime)s %(levelname)s %(name)s %(message)s"))
+    else:
+        stream_handler.setFormatter(logging.Formatter("%(asctime)s %(levelname)s %(name)s: %(message)s"))
+
+    log_queue: queue.SimpleQueue[logging.LogRecord] = queue.SimpleQueue()
+    root = logging.getLogger()
+    for handler in list(root.handlers):
+        root.removeHandler(handler)
+    root.addHandler(logging.handlers.QueueHandler(log_queue))
+    root.setLevel(level.upper())
+
+    _listener = logging.handlers.QueueListener(log_queue, stream_handler, respect_handler_level=True)
+    _listener.start()
+    atexit.register(shutdown_logging)
+
+
+def shutdown_logging() -> None:
+    """Flush queued records and stop the listener thread."""
+
+    global _listener
+    if _listener is not None:
+        _listener.stop()
+        _listener = None
+
+
+class LogThrottle:
+    """Lets `burst` messages per key through each `interval`, counting the rest.
+
+    `check` returns None when the message should be dropped, otherwise the
+    number of messages suppressed for that key since the last one that was
+    logged, so the caller can fold a summary count into its next line.
+    Counts for keys that went quiet are collected with `flush`, which the
+    caller runs on a timer so a burst that stops still gets its summary.
+    """
+
+    def __init__(self, *, interval: float = 10.0, burst: int = 5, max_keys: int = 1024) -> None:
+        self._interval = interval
+        self._burst = burst
+        self._max_keys = max_keys
+        # key -> [window_start, emitted_in_window, suppressed_since_last_emit]
+        self._state: OrderedDict[Hashable, list[float]] = OrderedDict()
+
+    @property
+    def interval(self) -> float:
+        return self._interval
+
+    def check(self, key: Hashable, now: float | None = None) -> int | None:
+        if now is None:
+            now = time.monotonic()
+        state = self._state.get(key)
+        if state is None:
+            state = [now, 0, 0]
+            self._state[key] = state
+            if len(self._state) > self._max_keys:
+                self._state.popitem(last=False)
+        else:
+            self._state.move_to_end(key)
+        if now - state[0] >= self._interval:
+            state[0] = now
+            state[1] = 0
+        if state[1] >= self._burst:
+            state[2] += 1
+            return None
+        state[1] += 1
+        suppressed = int(state[2])
+        state[2] = 0
+        return suppressed
+
+    def flush(self, now: float | None = None) -> list[tuple[Hashable, int]]:
+        """Return and reset pending counts for keys whose window has ended."""
+
+        if now is None:
+            now = time.monotonic()
+        pending = []
+        for key, state in self._state.items():
+            if state[2] and now - state[0] >= self._interval:
+                pending.append((key, int(state[2])))
+                state[2] = 0
+        return pending
+
+
+def suppressed_note(count: int) -> str:
+    """Suffix for a throttled log line; empty when nothing was suppressed."""
+
+    return f" ({count} similar suppressed)" if count else ""
@@ -1,49 +1,91 @@
+import asyncio
 import logging
-from fastapi import FastAPI, HTTPException
+from datetime import datetime, timedelta, timezone
+from typing import Any, Literal
+
+from fastapi import FastAPI, HTTPException, Query
+from fastapi.concurrency import run_in_threadpool
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import JSONResponse, Response
 
+from .capture import CaptureWriter
+from .codec import HistoryStore, encode_rows
 from .config import get_settings
 from .database import Database
-from .message_parser import register_temperature_topic, set_window_state_topic
+from .latest_cache import LatestValueCache
+from .lifecycle import StartupTracker, SubsystemState
+from .logging_setup import configure_logging
+from .message_parser import SITE_PATTERN, WINDOW_DEVICE_ID, WINDOW_METRIC, configure_from_settings
 from .mqtt_consumer import MQTTConsumer
-from .outside_temperature import OutsideTemperaturePublisher
-from .schemas import Measurement, WindowCommand, WindowState
+from .rate_limit import IngestLimits
+from .schemas import (
+    AlignedSeriesResponse,
+    Measurement,
+    ReadinessReport,
+    SeriesStats,
+    WindowCommand,
+    WindowState,
+)
+from .series_stats import SeriesStatsStore
 from .window_controller import WindowController
 
-logging.basicConfig(level=logging.INFO)
-logger = logging.getLogger(__name__)
+MAX_ALIGNED_SERIES = 16
+MAX_ALIGNED_BUCKETS = 5000
+MAX_EXPORT_HOURS = 24 * 7
 
 settings = get_settings()
-db = Database(settings.database_url)
+configure_logging(settings.log_level, json_format=settings.log_json)
+logger = logging.getLogger(__name__)
+
+tracker = StartupTracker()
+tracker.register("database")
+tracker.register("schema")
+tracker.register("cache", required=False)
+tracker.register("stats", required=False)
+tracker.register("mqtt")
+tracker.register("outside_temperature", required=False, enabled=settings.outside_temperature_enabled)
+
+db = Database(settings.database_url, default_site=settings.default_site)
+latest_cache = LatestValueCache()
+series_stats = SeriesStatsStore()
+history = HistoryStore(max_blocks=settings.history_max_blocks)
 consumer = MQTTConsumer(
     db,
     host=settings.mqtt_broker_host,
     port=settings.mqtt_broker_port,
     topic=settings.mqtt_topic,
+    cache=latest_cache,
+    tracker=tracker,
+    limits=IngestLimits(
+        device_rate=settings.ingest_device_rate,
+        device_burst=settings.ingest_device_burst,
+        topic_rate=settings.ingest_topic_rate,
+        topic_burst=settings.ingest_topic_burst,
+        global_rate=settings.ingest_global_rate,
+        global_burst=settings.ingest_global_burst,
+        max_series=settings.ingest_max_series,
+        series_idle_seconds=settings.ingest_series_idle_seconds,
+        write_queue_size=settings.ingest_write_queue_size,
+        writers=settings.ingest_writers,
+    ),
+    stats=series_stats,
+    history=history,
+    capture=(
+        CaptureWriter(
+            settings.capture_dir,
+            max_bytes=settings.capture_max_bytes,
+            max_files=settings.capture_max_files,
+        )
+        if settings.capture_dir
+        else None
+    ),
 )
 
-register_temperature_topic(
-    settings.outside_temperature_topic,
-    device_id="weather-service",
-    metric="temperature_outside_ambient",
-    unit="C",
-)
-set_window_state_topic(settings.window_state_topic)
+configure_from_settings(settings)
 
-outside_publisher = OutsideTemperaturePublisher(
-    host=settings.mqtt_broker_host,
-    port=settings.mqtt_broker_port,
-    topic=settings.outside_temperature_topic,
-    api_base_url=settings.outside_temperature_api_base_url,
-    latitude=settings.outside_temperature_latitude,
-    longitude=settings.outside_temperature_longitude,
-    timezone_name=settings.outside_temperature_timezone,
-    baseline=settings.outside_temperature_baseline,
-    variation=settings.outside_temperature_variation,
-    interval_seconds=settings.outside_temperature_interval_seconds,
-    user_agent=settings.outside_temperature_user_agent,
-    enabled=settings.outside_temperature_enabled,
-)
+# Created on startup only when enabled, so disabled deployments skip the import entirely.
+outside_publisher: Any = None
+_bootstrap_task: asyncio.Task | None = None
 
 window_controller = WindowController(
     host=settings.mqtt_broker_host,
@@ -61,19 +103,83 @@ app.add_middleware(
 )
 
 
+async def _start_storage() -> None:
+    # Writers may store rows while the rollups load; hold those until the rebuild is done.
+    series_stats.begin_rebuild()
+    await tracker.run_with_retry("database", db.connect)
+    await tracker.run_with_retry("schema", db.ensure_schema)
+
+    async def warm_cache() -> None:
+        latest_cache.warm(await db.fetch_latest_per_series())
+        logger.info("Latest-value cache warmed with %s series", len(latest_cache))
+
+    async def rebuild_stats() -> None:
+        cutoff, rollups = await db.fetch_rollups(hours=24)
+        series_stats.rebuild(rollups, cutoff=cutoff)
+        logger.info("Series statistics rebuilt for %s series", len(series_stats))
+
+    await asyncio.gather(
+        tracker.run_with_retry("cache", warm_cache),
+        tracker.run_with_retry("stats", rebuild_stats),
+    )
+
+
+async def _start_outside_publisher() -> None:
+    global outside_publisher
+    from .outside_temperature import OutsideTemperaturePublisher
+
+    outside_publisher = OutsideTemperaturePublisher(
+        host=settings.mqtt_broker_host,
+        port=settings.mqtt_broker_port,
+        topic=settings.outside_temperature_topic,
+        api_base_url=settings.outside_temperature_api_base_url,
+        latitude=settings.outside_temperature_latitude,
+        longitude=settings.outside_temperature_longitude,
+        timezone_name=settings.outside_temperature_timezone,
+        baseline=settings.outside_temperature_baseline,
+        variation=settings.outside_temperature_variation,
+        interval_seconds=settings.outside_temperature_interval_seconds,
+        user_agent=settings.outside_temperature_user_agent,
+        enabled=settings.outside_temperature_enabled,
+    )
+    await outside_publisher.start()
+    tracker.mark("outside_temperature", SubsystemState.READY)
+
+
+async def _bootstrap() -> None:
+    tasks = [_start_storage(), consumer.start()]
+    if settings.outside_temperature_enabled:
+        tasks.append(_start_outside_publisher())
+    await asyncio.gather(*tasks)
+
+
+SiteQuery = Query(..., pattern=SITE_PATTERN, description="Site (greenhouse) the query is scoped to")
+
+
+def _require_database() -> None:
+    if not db.ready:
+        raise HTTPException(status_code=503, detail="Database not ready")
+
+
 @app.on_event("startup")
 async def startup_event() -> None:
-    logger.info("Connecting to database and starting MQTT consumer")
-    await db.connect()
-    await consumer.start()
-    await outside_publisher.start()
+    global _bootstrap_task
+    logger.info("Starting subsystems in the background (startup took %.3fs)", tracker.elapsed())
+    _bootstrap_task = asyncio.create_task(_bootstrap())
 
 
 @app.on_event("shutdown")
 async def shutdown_event() -> None:
     logger.info("Shutting down MQTT consumer")
+    if _bootstrap_task is not None and not _bootstrap_task.done():
+        _bootstrap_task.cancel()
+        try:
+            await _bootstrap_task
+        except asyncio.CancelledError:
+            pass
     await consumer.stop()
-    await outside_publisher.stop()
+    if outside_publisher is not None:
+        await outside_publisher.stop()
     await db.disconnect()
 
 
@@ -82,26 +188,133 @@ async def health() -> dict[str, str]:
     return {"status": "ok"}
 
 
+@app.get("/ready", response_model=ReadinessReport, tags=["system"])
+async def ready():
+    report = tracker.snapshot()
+    return JSONResponse(report, status_code=200 if report["ready"] else 503)
+
+
+@app.get("/ingest", tags=["system"])
+async def ingest_stats() -> dict[str, Any]:
+    return {
+        **consumer.stats(),
+        "history": history.stats(),
+        "stats_rebuild_dropped": series_stats.pending_dropped,
+    }
+
+
+@app.get("/stats", response_model=list[SeriesStats], tags=["measurements"])
+async def get_stats(site: str = SiteQuery, device_id: str | None = None, metric: str | None = None):
+    if not tracker.is_ready("stats"):
+        raise HTTPException(status_code=503, detail="Series statistics not ready")
+    return series_stats.summaries(site=site, device_id=device_id, metric=metric)
+
+
+@app.get("/export", tags=["measurements"], response_class=Response)
+async def export_measurements(
+    site: str = SiteQuery,
+    source: Literal["database", "memory"] = "database",
+    hours: int = Query(24, ge=1, le=MAX_EXPORT_HOURS),
+    device_id: str | None = None,
+    metric: str | None = None,
+):
+    """Compressed CPGZ stream of (ts, value) per series; see `app.codec` for the layout.
+
+    `source=memory` serves whatever the in-memory history retains and ignores `hours`.
+    """
+
+    if source == "memory":
+        content = history.export(site=site, device_id=device_id, metric=metric)
+    else:
+        _require_database()
+        rows = await db.fetch_points(site=site, hours=hours, device_id=device_id, metric=metric)
+        # Encoding is CPU-bound; keep it off the event loop so ingest and other endpoints keep running.
+        content = await run_in_threadpool(encode_rows, rows, site=site)
+    return Response(content=content, media_type="application/octet-stream")
+
+
 @app.get("/measurements", response_model=list[Measurement], tags=["measurements"])
-async def get_measurements(limit: int | None = None, hours: int | None = None):
-    rows = await db.fetch_recent(limit=limit, hours=hours)
+async def get_measurements(site: str = SiteQuery, limit: int | None = None, hours: int | None = None):
+    _require_database()
+    rows = await db.fetch_recent(site=site, limit=limit, hours=hours)
     return rows
 
 
+def _parse_series_spec(spec: str) -> tuple[str, str]:
+    device_id, sep, metric = spec.partition(":")
+    if not sep or not device_id or not metric:
+        raise HTTPException(status_code=400, detail=f"Series must be 'device_id:metric', got {spec!r}")
+    return device_id, metric
+
+
+@app.get("/series/aligned", response_model=AlignedSeriesResponse, tags=["measurements"])
+async def get_aligned_series(
+    site: str = SiteQuery,
+    series: list[str] = Query(..., description="Repeatable 'device_id:metric' pairs"),
+    bucket_seconds: int = Query(300, ge=1),
+    hours: int = Query(24, ge=1),
+    fill: Literal["none", "locf", "interpolate"] = "locf",
+):
+    if len(series) > MAX_ALIGNED_SERIES:
+        raise HTTPException(status_code=400, detail=f"At most {MAX_ALIGNED_SERIES} series per request")
+    if hours * 3600 // bucket_seconds > MAX_ALIGNED_BUCKETS:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Range/bucket combination exceeds {MAX_ALIGNED_BUCKETS} buckets",
+        )
+    pairs = [_parse_series_spec(spec) for spec in series]
+    _require_database()
+    end = datetime.now(timezone.utc)
+    start = end - timedelta(hours=hours)
+    matrix = await db.fetch_aligned(
+        pairs,
+        site=site,
+        bucket=timedelta(seconds=bucket_seconds),
+        start=start,
+        end=end,
+        fill=fill,
+    )
+    return {
+        "bucket_seconds": bucket_seconds,
+        "fill": fill,
+        "start": start,
+        "end": end,
+        **matrix,
+    }
+
+
+async def _latest_window_state(site: str) -> dict[str, Any] | None:
+    latest = latest_cache.get(site, WINDOW_DEVICE_ID, WINDOW_METRIC)
+    if latest is None:
+        _require_database()
+        latest = await db.fetch_latest(WINDOW_DEVICE_ID, WINDOW_METRIC, site=site)
+    return latest
+
+
+def _window_command_topic(site: str) -> str:
+    # The default site keeps the unprefixed topic the existing window clients subscribe to.
+    if site == settings.default_site or not settings.site_topic_prefix:
+        return settings.window_command_topic
+    return f"{settings.site_topic_prefix.strip('/')}/{site}/{settings.window_command_topic}"
+
+
 @app.get("/window-state", response_model=WindowState, tags=["window"])
-async def get_window_state():
-    latest = await db.fetch_latest("window-actuator", "window_closed")
+async def get_window_state(site: str = SiteQuery):
+    latest = await _latest_window_state(site)
     if latest is None:
         return WindowState(state=None, ts=None, payload=None)
     return WindowState(state=latest.get("value"), ts=latest.get("ts"), payload=latest.get("payload"))
 
 
 @app.post("/window-state", response_model=WindowState, tags=["window"])
-async def set_window_state(command: WindowCommand):
+async def set_window_state(command: WindowCommand, site: str = SiteQuery):
     if command.state not in (0, 1):
         raise HTTPException(status_code=400, detail="State must be 0 (open) or 1 (closed)")
-    await window_controller.publish_state(command.state)
-    latest = await db.fetch_latest("window-actuator", "window_closed")
+    await window_controller.publish_state(command.state, topic=_window_command_topic(site))
+    if db.ready:
+        latest = await _latest_window_state(site)
+    else:
+        latest = latest_cache.get(site, WINDOW_DEVICE_ID, WINDOW_METRIC)
     return WindowState(
         state=command.state,
         ts=latest.get("ts") if latest else None,
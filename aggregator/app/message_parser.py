@@ -2,8 +2,20 @@
 from __future__ import annotations
 
 from dataclasses import dataclass
-from typing import Any
+from typing import TYPE_CHECKING, Any, Iterable
 import json
+import re
+
+if TYPE_CHECKING:
+    from .config import Settings
+
+DEFAULT_SITE = "default"
+# Sites become a single MQTT topic level, so wildcards and separators are not allowed.
+SITE_PATTERN = r"^[A-Za-z0-9_-]+$"
+_SITE_RE = re.compile(SITE_PATTERN)
+WINDOW_DEVICE_ID = "window-actuator"
+WINDOW_METRIC = "window_closed"
+
 
 @dataclass(slots=True)
 class ParsedMeasurement:
@@ -11,6 +23,7 @@ class ParsedMeasurement:
     metric: str
     value: float
     payload: dict[str, Any] | None = None
+    site: str = DEFAULT_SITE
 
 
 _TEMPERATURE_TOPICS: dict[str, tuple[str, str, str]] = {
@@ -18,6 +31,9 @@ _TEMPERATURE_TOPICS: dict[str, tuple[str, str, str]] = {
     "czujnik/okno/temperatura/zewn": ("window-sensor", "temperature_outside", "C"),
 }
 _WINDOW_STATE_TOPIC = "okno/stan"
+_SITE_TOPIC_PREFIX = ""
+_ALLOWED_SITES: frozenset[str] = frozenset()
+_DEFAULT_SITE = DEFAULT_SITE
 
 
 def set_window_state_topic(topic: str) -> None:
@@ -27,6 +43,44 @@ def set_window_state_topic(topic: str) -> None:
         _WINDOW_STATE_TOPIC = normalized
 
 
+def set_site_topic_prefix(
+    prefix: str, *, default_site: str = DEFAULT_SITE, allowed_sites: Iterable[str] = ()
+) -> None:
+    """Topics under `<prefix>/<site>/...` belong to `<site>`; anything else to `default_site`.
+
+    An empty prefix turns site routing off. When `allowed_sites` is given, any
+    other site in the prefix is treated as `default_site`, so publishers cannot
+    create sites on their own.
+    """
+
+    global _SITE_TOPIC_PREFIX, _DEFAULT_SITE, _ALLOWED_SITES
+    normalized = prefix.strip().strip("/")
+    _SITE_TOPIC_PREFIX = f"{normalized}/" if normalized else ""
+    if default_site.strip():
+        if not is_valid_site(default_site.strip()):
+            raise ValueError(f"Invalid default site {default_site!r}")
+        _DEFAULT_SITE = default_site.strip()
+    sites = frozenset(site.strip() for site in allowed_sites if site.strip())
+    invalid = sorted(site for site in sites if not is_valid_site(site))
+    if invalid:
+        raise ValueError(f"Invalid site names {invalid!r}")
+    _ALLOWED_SITES = sites
+
+
+def is_valid_site(site: str) -> bool:
+    return _SITE_RE.match(site) is not None
+
+
+def split_site(topic: str) -> tuple[str, str]:
+    """Return (site, topic relative to the site) for a raw MQTT topic."""
+
+    if _SITE_TOPIC_PREFIX and topic.startswith(_SITE_TOPIC_PREFIX):
+        site, sep, rest = topic[len(_SITE_TOPIC_PREFIX):].partition("/")
+        if sep and rest and is_valid_site(site) and (not _ALLOWED_SITES or site in _ALLOWED_SITES):
+            return site, rest
+    return _DEFAULT_SITE, topic
+
+
 def _parse_temperature(topic: str, text_value: str) -> ParsedMeasurement | None:
     mapping = _TEMPERATURE_TOPICS.get(topic)
     if mapping is None:
@@ -66,8 +120,8 @@ def _parse_window_state(text_value: str) -> ParsedMeasurement:
         "state": "closed" if state == 1.0 else "open",
     }
     return ParsedMeasurement(
-        device_id="window-actuator",
-        metric="window_closed",
+        device_id=WINDOW_DEVICE_ID,
+        metric=WINDOW_METRIC,
         value=state,
         payload=payload,
     )
@@ -82,14 +136,38 @@ def register_temperature_topic(topic: str, *, device_id: str, metric: str, unit:
     _TEMPERATURE_TOPICS[normalized_topic] = (device_id, metric, unit)
 
 
+def configure_from_settings(settings: Settings) -> None:
+    """Apply the topic mapping from settings; shared by the API process and `app.replay`."""
+
+    register_temperature_topic(
+        settings.outside_temperature_topic,
+        device_id="weather-service",
+        metric="temperature_outside_ambient",
+        unit="C",
+    )
+    set_window_state_topic(settings.window_state_topic)
+    set_site_topic_prefix(
+        settings.site_topic_prefix, default_site=settings.default_site, allowed_sites=settings.site_list
+    )
+
+
 def parse_mqtt_message(topic: str, payload: bytes) -> ParsedMeasurement | None:
     """Try to interpret a raw MQTT message.
 
-    Preference order:
+    The site is taken from a `<prefix>/<site>/` topic prefix (see
+    `set_site_topic_prefix`) and the remainder is matched in order:
     1. Known structured topics (window temperatures/state)
     2. JSON payloads containing device_id/metric/value
     """
 
+    site, topic = split_site(topic)
+    parsed = _parse_site_message(topic, payload)
+    if parsed is not None:
+        parsed.site = site
+    return parsed
+
+
+def _parse_site_message(topic: str, payload: bytes) -> ParsedMeasurement | None:
     text_value = payload.decode("utf-8", errors="ignore").strip()
 
     if topic in _TEMPERATURE_TOPICS:
@@ -114,6 +192,9 @@ def parse_mqtt_message(topic: str, payload: bytes) -> ParsedMeasurement | None:
 
     device_id = data.get("device_id", "unknown")
     metric = data.get("metric", topic)
+    # Both end up in hash keys and database columns, so anything but a non-empty string is rejected.
+    if not isinstance(device_id, str) or not device_id or not isinstance(metric, str) or not metric:
+        return None
     try:
         value = float(data.get("value"))
     except (TypeError, ValueError):
@@ -1,12 +1,21 @@
 import asyncio
 import logging
+import time
+from collections import Counter
 from contextlib import asynccontextmanager
 from typing import Any
 
 from asyncio_mqtt import Client, MqttError
 
+from .capture import CaptureWriter
+from .codec import HistoryStore
 from .database import Database
+from .latest_cache import LatestValueCache
+from .lifecycle import StartupTracker, SubsystemState
+from .logging_setup import LogThrottle, suppressed_note
 from .message_parser import ParsedMeasurement, parse_mqtt_message
+from .rate_limit import IngestLimits, KeyedRateLimiter, SeriesRegistry
+from .series_stats import SeriesStatsStore
 
 logger = logging.getLogger(__name__)
 
@@ -21,16 +30,59 @@ def _topic_to_str(topic: Any) -> str:
 
 
 class MQTTConsumer:
-    def __init__(self, db: Database, *, host: str, port: int, topic: str):
+    def __init__(
+        self,
+        db: Database,
+        *,
+        host: str,
+        port: int,
+        topic: str,
+        cache: LatestValueCache | None = None,
+        tracker: StartupTracker | None = None,
+        limits: IngestLimits | None = None,
+        stats: SeriesStatsStore | None = None,
+        history: HistoryStore | None = None,
+        capture: CaptureWriter | None = None,
+    ):
         self._db = db
         self._host = host
         self._port = port
         self._topic = topic
+        self._cache = cache
+        self._tracker = tracker
+        self._series_stats = stats
+        self._history = history
+        self._capture = capture
+        self._limits = limits or IngestLimits()
+        self._topic_limiter = KeyedRateLimiter(rate=self._limits.topic_rate, burst=self._limits.topic_burst)
+        self._device_limiter = KeyedRateLimiter(rate=self._limits.device_rate, burst=self._limits.device_burst)
+        self._global_limiter = KeyedRateLimiter(rate=self._limits.global_rate, burst=self._limits.global_burst)
+        self._known_series = SeriesRegistry(
+            max_series=self._limits.max_series, idle_seconds=self._limits.series_idle_seconds
+        )
+        self._queue: asyncio.Queue[ParsedMeasurement] = asyncio.Queue(
+            maxsize=max(1, self._limits.write_queue_size)
+        )
+        self._counters: Counter[str] = Counter()
+        self._log_throttle = LogThrottle()
         self._task: asyncio.Task | None = None
+        self._writers: list[asyncio.Task] = []
+        self._log_flusher: asyncio.Task | None = None
         self._stop = asyncio.Event()
 
-    async def start(self) -> None:
-        if self._task is None:
+    async def start(self, *, subscribe: bool = True) -> None:
+        """Start the writer tasks and, unless `subscribe` is false, the broker loop.
+
+        Without a subscription messages are fed through `ingest` directly (see `app.replay`).
+        """
+
+        if not self._writers:
+            self._writers = [
+                asyncio.create_task(self._write_loop()) for _ in range(max(1, self._limits.writers))
+            ]
+        if self._log_flusher is None:
+            self._log_flusher = asyncio.create_task(self._flush_log_throttle())
+        if subscribe and self._task is None:
             logger.info(
                 "Starting MQTT consumer task (host=%s port=%s topic=%s)",
                 self._host,
@@ -39,51 +91,189 @@ class MQTTConsumer:
             )
             self._task = asyncio.create_task(self._run())
 
+    async def drain(self) -> None:
+        await self._queue.join()
+
     async def stop(self) -> None:
         self._stop.set()
         if self._task:
             await self._task
             self._task = None
+        if self._writers:
+            try:
+                await asyncio.wait_for(self._queue.join(), timeout=5)
+            except asyncio.TimeoutError:
+                logger.warning("Dropping %s queued measurements on shutdown", self._queue.qsize())
+            for writer in self._writers:
+                writer.cancel()
+            await asyncio.gather(*self._writers, return_exceptions=True)
+            self._writers = []
+        if self._log_flusher is not None:
+            self._log_flusher.cancel()
+            await asyncio.gather(self._log_flusher, return_exceptions=True)
+            self._log_flusher = None
+            # Report whatever is still pending, even if its window has not ended yet.
+            self._log_suppressed(now=float("inf"))
+        if self._capture is not None:
+            await asyncio.to_thread(self._capture.close)
+
+    def stats(self) -> dict[str, Any]:
+        return {
+            "queue_depth": self._queue.qsize(),
+            "queue_capacity": self._queue.maxsize,
+            "series": len(self._known_series),
+            "max_series": self._limits.max_series,
+            "counters": dict(self._counters),
+            "capture": self._capture.stats() if self._capture is not None else None,
+        }
 
     async def _run(self) -> None:
         logger.info("MQTT consumer loop running")
         while not self._stop.is_set():
             try:
                 logger.debug("Connecting to MQTT broker at %s:%s", self._host, self._port)
+                self._mark(SubsystemState.STARTING)
                 async with self._client() as client:
                     logger.info("Connected to MQTT broker, subscribing to %s", self._topic)
                     await client.subscribe(self._topic)
+                    self._mark(SubsystemState.READY)
+                    # Left unbounded: ingest never waits here (a full write queue sheds and counts),
+                    # so the client queue drains as fast as it fills and every drop shows up in
+                    # /ingest instead of the library's per-message "queue is full" warning.
                     async with client.messages() as messages:
                         async for message in messages:
                             if self._stop.is_set():
                                 break
-                            await self._handle_message(message.topic, message.payload)
+                            await self.ingest(message.topic, message.payload)
             except MqttError as exc:
                 logger.warning("MQTT connection lost: %s", exc)
+                self._mark(SubsystemState.RETRYING, str(exc))
                 await asyncio.sleep(5)
             except Exception as exc:  # pragma: no cover - defensive logging
                 logger.exception("Unexpected MQTT consumer error: %s", exc)
+                self._mark(SubsystemState.RETRYING, str(exc))
                 await asyncio.sleep(5)
+        self._mark(SubsystemState.STOPPED)
+
+    def _mark(self, state: SubsystemState, error: str | None = None) -> None:
+        if self._tracker is not None:
+            self._tracker.mark("mqtt", state, error)
 
     @asynccontextmanager
     async def _client(self):
         async with Client(hostname=self._host, port=self._port) as client:
             yield client
 
-    async def _handle_message(self, topic: str, payload: bytes) -> None:
+    async def ingest(self, topic: Any, payload: bytes, *, wait: bool = False) -> None:
+        """Parse, rate-limit and queue one message for the writers.
+
+        A full write queue sheds the message unless `wait` is set, in which case
+        the caller blocks until a writer frees a slot (used by `app.replay`).
+        """
+
         topic_value = _topic_to_str(topic)
         logger.debug("MQTT message received topic=%r payload=%r", topic_value, payload)
-        parsed: ParsedMeasurement | None = parse_mqtt_message(topic_value, payload)
+        self._counters["received"] += 1
+        if self._capture is not None:
+            self._capture.write(time.time(), topic_value, payload)
+        # Per topic first so one noisy topic does not also drain the global budget.
+        if not self._topic_limiter.allow(topic_value):
+            self._counters["shed_topic_rate"] += 1
+            return
+        if not self._global_limiter.allow(None):
+            self._counters["shed_global_rate"] += 1
+            return
+
+        try:
+            parsed: ParsedMeasurement | None = parse_mqtt_message(topic_value, payload)
+        except Exception:
+            # A parser bug must shed the message, not tear down the broker connection.
+            logger.debug("Parser raised for topic %r", topic_value, exc_info=True)
+            parsed = None
         if parsed is None:
-            logger.warning("Unable to parse MQTT payload for topic %r payload=%r", topic_value, payload)
+            self._counters["unparsable"] += 1
+            # One key for all topics, so spam spread over fresh topics is still throttled.
+            suppressed = self._log_throttle.check("unparsable")
+            if suppressed is not None:
+                logger.warning(
+                    "Unable to parse MQTT payload for topic %r payload=%r%s",
+                    topic_value,
+                    payload[:256],
+                    suppressed_note(suppressed),
+                )
+            return
+
+        if not self._device_limiter.allow((parsed.site, parsed.device_id)):
+            self._counters["shed_device_rate"] += 1
             return
+        if self._queue.full() and not wait:
+            self._counters["shed_queue_full"] += 1
+            return
+        if not self._known_series.admit((parsed.site, parsed.device_id, parsed.metric)):
+            self._counters["shed_series_cap"] += 1
+            return
+
+        if self._queue.full():
+            self._counters["backpressure_waits"] += 1
+        await self._queue.put(parsed)
 
-        await self._db.insert_measurement(
+    async def _flush_log_throttle(self) -> None:
+        while True:
+            await asyncio.sleep(self._log_throttle.interval)
+            self._log_suppressed()
+
+    def _log_suppressed(self, now: float | None = None) -> None:
+        for key, count in self._log_throttle.flush(now):
+            logger.warning("Suppressed %s similar log lines for %r", count, key)
+
+    async def _write_loop(self) -> None:
+        while True:
+            parsed = await self._queue.get()
+            try:
+                await self._store(parsed)
+            except Exception as exc:
+                self._counters["write_errors"] += 1
+                suppressed = self._log_throttle.check("write_error")
+                if suppressed is not None:
+                    logger.exception(
+                        "Failed to store measurement device=%s metric=%s: %s%s",
+                        parsed.device_id,
+                        parsed.metric,
+                        exc,
+                        suppressed_note(suppressed),
+                    )
+            finally:
+                self._queue.task_done()
+
+    async def _store(self, parsed: ParsedMeasurement) -> None:
+        if self._tracker is not None and not self._db.ready:
+            # Subscription may finish before the database; hold messages until it is usable.
+            await self._tracker.wait_ready("schema")
+
+        row = await self._db.insert_measurement(
             device_id=parsed.device_id,
             metric=parsed.metric,
             value=parsed.value,
             payload=parsed.payload,
+            site=parsed.site,
         )
-        logger.info(
-            "Stored measurement device=%s metric=%s value=%s", parsed.device_id, parsed.metric, parsed.value
-        )
+        self._counters["stored"] += 1
+        if self._cache is not None:
+            self._cache.update(row)
+        if self._series_stats is not None:
+            self._series_stats.update(row)
+        if self._history is not None:
+            self._history.update(row)
+        if self._tracker is not None:
+            self._tracker.record_first_message()
+        if logger.isEnabledFor(logging.INFO):
+            suppressed = self._log_throttle.check(("stored", parsed.site, parsed.device_id, parsed.metric))
+            if suppressed is not None:
+                logger.info(
+                    "Stored measurement site=%s device=%s metric=%s value=%s%s",
+                    parsed.site,
+                    parsed.device_id,
+                    parsed.metric,
+                    parsed.value,
+                    suppressed_note(suppressed),
+                )
@@ -6,11 +6,13 @@ import logging
 import random
 from contextlib import asynccontextmanager
 from datetime import datetime, timezone
-from typing import Any
+from typing import TYPE_CHECKING, Any
 
-import httpx
 from asyncio_mqtt import Client, MqttError
 
+if TYPE_CHECKING:
+    import httpx
+
 logger = logging.getLogger(__name__)
 
 
@@ -74,6 +76,9 @@ class OutsideTemperaturePublisher:
         self._stop = asyncio.Event()
 
     async def _run(self) -> None:
+        # Imported here so deployments with the publisher disabled never load httpx.
+        import httpx
+
         while not self._stop.is_set():
             try:
                 async with self._mqtt_client() as mqtt_client:
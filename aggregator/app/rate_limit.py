@@ -0,0 +1,113 @@
+"""Token-bucket rate limiting used to shed abusive MQTT publishers on ingest."""
+from __future__ import annotations
+
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Hashable
+
+
+@dataclass(slots=True)
+class TokenBucket:
+    rate: float
+    burst: float
+    tokens: float
+    updated: float
+
+    def try_acquire(self, now: float) -> bool:
+        self.tokens = min(self.burst, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+        if self.tokens >= 1.0:
+            self.tokens -= 1.0
+            return True
+        return False
+
+
+class KeyedRateLimiter:
+    """One token bucket per key, bounded to `max_keys` with least-recently-used eviction.
+
+    A rate of zero (or less) disables limiting for this limiter.
+    """
+
+    def __init__(self, *, rate: float, burst: float, max_keys: int = 10_000) -> None:
+        self._rate = rate
+        self._burst = max(1.0, burst)
+        self._max_keys = max_keys
+        self._buckets: OrderedDict[Hashable, TokenBucket] = OrderedDict()
+
+    @property
+    def enabled(self) -> bool:
+        return self._rate > 0
+
+    def allow(self, key: Hashable, now: float | None = None) -> bool:
+        if not self.enabled:
+            return True
+        if now is None:
+            now = time.monotonic()
+        bucket = self._buckets.get(key)
+        if bucket is None:
+            bucket = TokenBucket(rate=self._rate, burst=self._burst, tokens=self._burst, updated=now)
+            self._buckets[key] = bucket
+            if len(self._buckets) > self._max_keys:
+                self._buckets.popitem(last=False)
+        else:
+            self._buckets.move_to_end(key)
+        return bucket.try_acquire(now)
+
+    def __len__(self) -> int:
+        return len(self._buckets)
+
+
+class SeriesRegistry:
+    """Admits up to `max_series` distinct series, forgetting any idle for `idle_seconds`.
+
+    Series are kept in least-recently-seen order, so a one-off burst of junk
+    keys expires and frees its slots for series that keep reporting.
+    """
+
+    def __init__(self, *, max_series: int, idle_seconds: float) -> None:
+        self._max_series = max_series
+        self._idle_seconds = idle_seconds
+        self._last_seen: OrderedDict[Hashable, float] = OrderedDict()
+
+    def admit(self, key: Hashable, now: float | None = None) -> bool:
+        if now is None:
+            now = time.monotonic()
+        if key in self._last_seen:
+            self._last_seen[key] = now
+            self._last_seen.move_to_end(key)
+            return True
+        horizon = now - self._idle_seconds
+        while self._last_seen:
+            oldest_key, oldest_seen = next(iter(self._last_seen.items()))
+            if oldest_seen > horizon:
+                break
+            del self._last_seen[oldest_key]
+        if len(self._last_seen) >= self._max_series:
+            return False
+        self._last_seen[key] = now
+        return True
+
+    def __len__(self) -> int:
+        return len(self._last_seen)
+
+
+@dataclass(slots=True)
+class IngestLimits:
+    """Ingest budgets; a rate of zero disables that limiter.
+
+    Several devices may publish JSON to one shared topic, so the per-topic rate
+    is kept well above the per-device rate; the global rate caps the total and
+    cannot be sidestepped by spreading traffic over fresh topics.
+    """
+
+    device_rate: float = 5.0
+    device_burst: float = 20.0
+    topic_rate: float = 50.0
+    topic_burst: float = 200.0
+    global_rate: float = 200.0
+    global_burst: float = 500.0
+    max_series: int = 500
+    series_idle_seconds: float = 900.0
+    write_queue_size: int = 1000
+    writers: int = 2
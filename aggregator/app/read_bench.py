@@ -0,0 +1,364 @@
+"""Read-path load test and query-latency regression check for the HTTP API.
+
+Seed a scratch TimescaleDB with realistic volumes, start the aggregator
+against it, then drive the read endpoints with concurrent dashboard clients::
+
+    python -m app.read_bench seed --database-url DSN [--rows 10000000] [--series 50] [--truncate]
+    python -m app.read_bench run --database-url DSN --base-url http://localhost:8000 \\
+        [--clients 20] [--duration 60] [--baseline read_bench_baseline.json] [--update-baseline]
+
+`run` records p50/p95/p99 latency per request shape, captures
+``EXPLAIN (ANALYZE, BUFFERS)`` plans for the SQL behind each shape and writes
+everything to ``--report``. With ``--baseline`` it exits non-zero when a
+shape's p95 regresses past the stored value (plus tolerance) or a query that
+used an index now sequentially scans ``measurements``. Any failed request
+fails the run, and ``--update-baseline`` only writes runs without failures.
+"""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+import json
+import math
+import random
+import sys
+import time
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+from typing import Any
+
+import asyncpg
+
+from .database import Database
+from .message_parser import DEFAULT_SITE, WINDOW_DEVICE_ID, WINDOW_METRIC
+
+_CANONICAL_SERIES: tuple[tuple[str, str], ...] = (
+    ("window-sensor", "temperature_inside"),
+    ("window-sensor", "temperature_outside"),
+    ("weather-service", "temperature_outside_ambient"),
+    (WINDOW_DEVICE_ID, WINDOW_METRIC),
+)
+_SERIES_PER_SITE = 10
+_SEED_INTERVAL_SECONDS = 60
+_COPY_CHUNK = 100_000
+
+_ALIGNED_QUERY = (
+    "series=window-sensor:temperature_inside&series=window-sensor:temperature_outside"
+    "&series=weather-service:temperature_outside_ambient&bucket_seconds=300&hours=24"
+)
+# name -> path template; {site} is filled per request. Mirrors what the dashboard and its cards call.
+SHAPES: dict[str, str] = {
+    "measurements_24h": "/measurements?site={site}&hours=24",
+    "measurements_limit100": "/measurements?site={site}&limit=100",
+    "window_state": "/window-state?site={site}",
+    "aligned_24h": "/series/aligned?site={site}&" + _ALIGNED_QUERY,
+    "stats": "/stats?site={site}",
+    "export_24h": "/export?site={site}&hours=24",
+}
+
+
+def site_names(series: int) -> list[str]:
+    count = max(1, math.ceil(series / _SERIES_PER_SITE))
+    return [DEFAULT_SITE] + [f"bench-{index:02d}" for index in range(1, count)]
+
+
+def series_layout(series: int) -> list[tuple[str, str, str]]:
+    layout: list[tuple[str, str, str]] = []
+    for site in site_names(series):
+        for index in range(_SERIES_PER_SITE):
+            if len(layout) == series:
+                return layout
+            if index < len(_CANONICAL_SERIES):
+                device_id, metric = _CANONICAL_SERIES[index]
+            else:
+                device_id, metric = f"bench-sensor-{index}", "humidity"
+            layout.append((site, device_id, metric))
+    return layout
+
+
+async def seed(database_url: str, *, rows: int, series: int, truncate: bool) -> None:
+    db = Database(database_url)
+    await db.connect()
+    await db.ensure_schema()
+    await db.disconnect()
+
+    conn = await asyncpg.connect(database_url)
+    try:
+        existing = await conn.fetchval("SELECT count(*) FROM measurements")
+        if existing and not truncate:
+            raise SystemExit(f"measurements already holds {existing} rows; pass --truncate to replace them")
+        if truncate:
+            await conn.execute("TRUNCATE measurements")
+
+        layout = series_layout(series)
+        per_series = rows // len(layout)
+        end = datetime.now(timezone.utc).replace(second=0, microsecond=0)
+        start = end - timedelta(seconds=_SEED_INTERVAL_SECONDS * per_series)
+        rng = random.Random(34)
+        started = time.perf_counter()
+        inserted = 0
+        for site, device_id, metric in layout:
+            payload = json.dumps({"unit": "C", "source": "read-bench"})
+            base = rng.uniform(-5.0, 25.0)
+            batch: list[tuple[Any, ...]] = []
+            for index in range(per_series):
+                ts = start + timedelta(seconds=_SEED_INTERVAL_SECONDS * index + rng.randint(-5, 5))
+                if metric == WINDOW_METRIC:
+                    value = 1.0 if (index // 180) % 4 else 0.0
+                else:
+                    value = round(base + 4 * math.sin(index / 720) + rng.gauss(0, 0.2), 2)
+                batch.append((site, device_id, metric, value, ts, payload))
+                if len(batch) >= _COPY_CHUNK:
+                    await _copy(conn, batch)
+                    inserted += len(batch)
+                    batch = []
+            if batch:
+                await _copy(conn, batch)
+                inserted += len(batch)
+            print(f"seeded {site}/{device_id}/{metric}: {inserted} rows so far")
+        await conn.execute("ANALYZE measurements")
+        elapsed = time.perf_counter() - started
+        print(f"seeded {inserted} rows across {len(layout)} series in {elapsed:.1f}s")
+    finally:
+        await conn.close()
+
+
+async def _copy(conn: asyncpg.Connection, batch: list[tuple[Any, ...]]) -> None:
+    await conn.copy_records_to_table(
+        "measurements",
+        records=batch,
+        columns=["site", "device_id", "metric", "value", "ts", "payload"],
+    )
+
+
+def percentile(samples: list[float], fraction: float) -> float:
+    ordered = sorted(samples)
+    index = min(len(ordered) - 1, max(0, math.ceil(fraction * len(ordered)) - 1))
+    return ordered[index]
+
+
+async def drive_load(base_url: str, sites: list[str], *, clients: int, duration: float) -> dict[str, Any]:
+    import httpx
+
+    latencies: dict[str, list[float]] = {name: [] for name in SHAPES}
+    errors: dict[str, int] = {name: 0 for name in SHAPES}
+    deadline = time.perf_counter() + duration
+
+    async def dashboard_client(client: httpx.AsyncClient, seed_value: int) -> None:
+        rng = random.Random(seed_value)
+        names = list(SHAPES)
+        while time.perf_counter() < deadline:
+            rng.shuffle(names)
+            site = rng.choice(sites)
+            for name in names:
+                started = time.perf_counter()
+                try:
+                    response = await client.get(SHAPES[name].format(site=site))
+                    await response.aread()
+                    failed = response.status_code >= 400
+                except httpx.HTTPError:
+                    failed = True
+                elapsed_ms = (time.perf_counter() - started) * 1000
+                if failed:
+                    errors[name] += 1
+                else:
+                    latencies[name].append(elapsed_ms)
+
+    limits = httpx.Limits(max_connections=clients, max_keepalive_connections=clients)
+    async with httpx.AsyncClient(base_url=base_url, timeout=30.0, limits=limits) as client:
+        # One warm-up pass so the first measured requests do not pay for connection setup.
+        for path in SHAPES.values():
+            await client.get(path.format(site=sites[0]))
+        await asyncio.gather(*(dashboard_client(client, index) for index in range(clients)))
+
+    report: dict[str, Any] = {}
+    for name, samples in latencies.items():
+        if not samples:
+            report[name] = {"requests": 0, "errors": errors[name]}
+            continue
+        report[name] = {
+            "requests": len(samples),
+            "errors": errors[name],
+            "p50_ms": round(percentile(samples, 0.50), 2),
+            "p95_ms": round(percentile(samples, 0.95), 2),
+            "p99_ms": round(percentile(samples, 0.99), 2),
+            "rps": round(len(samples) / duration, 1),
+        }
+    return report
+
+
+def _plan_nodes(node: dict[str, Any]) -> list[str]:
+    label = node["Node Type"]
+    if "Index Name" in node:
+        label += f" using {node['Index Name']}"
+    elif "Relation Name" in node:
+        label += f" on {node['Relation Name']}"
+    nodes = [label]
+    for child in node.get("Plans", []):
+        nodes.extend(_plan_nodes(child))
+    return nodes
+
+
+async def capture_plans(database_url: str, site: str) -> dict[str, Any]:
+    """Run the Database calls behind each SQL-backed shape and EXPLAIN the queries they issue."""
+
+    captured: list[tuple[str, tuple[Any, ...]]] = []
+
+    async def on_connect(conn: asyncpg.Connection) -> None:
+        conn.add_query_logger(lambda record: captured.append((record.query, tuple(record.args or ()))))
+
+    db = Database(database_url, on_connect=on_connect)
+    await db.connect()
+    await db.ensure_schema()
+    end = datetime.now(timezone.utc)
+    calls = {
+        "measurements_24h": lambda: db.fetch_recent(site=site, hours=24, limit=None),
+        "measurements_limit100": lambda: db.fetch_recent(site=site, limit=100),
+        "window_state": lambda: db.fetch_latest(WINDOW_DEVICE_ID, WINDOW_METRIC, site=site),
+        "aligned_24h": lambda: db.fetch_aligned(
+            list(_CANONICAL_SERIES[:3]),
+            site=site,
+            bucket=timedelta(minutes=5),
+            start=end - timedelta(hours=24),
+            end=end,
+        ),
+        "export_24h": lambda: db.fetch_points(site=site, hours=24),
+    }
+    plans: dict[str, Any] = {}
+    conn = await asyncpg.connect(database_url)
+    try:
+        for name, call in calls.items():
+            captured.clear()
+            await call()
+            if not captured:
+                continue
+            query, args = captured[-1]
+            raw = await conn.fetchval(f"EXPLAIN (ANALYZE, BUFFERS, FORMAT JSON) {query}", *args)
+            plan = json.loads(raw)[0] if isinstance(raw, str) else raw[0]
+            plans[name] = {
+                "query": " ".join(query.split()),
+                "execution_ms": plan.get("Execution Time"),
+                "nodes": _plan_nodes(plan["Plan"]),
+                "plan": plan,
+            }
+    finally:
+        await conn.close()
+        await db.disconnect()
+    return plans
+
+
+def compare(
+    report: dict[str, Any], baseline: dict[str, Any], *, tolerance: float, slack_ms: float
+) -> list[str]:
+    failures: list[str] = []
+    for name, previous in baseline.get("latency", {}).items():
+        current = report["latency"].get(name)
+        if current is None or "p95_ms" not in current or "p95_ms" not in previous:
+            continue
+        limit = previous["p95_ms"] * (1 + tolerance) + slack_ms
+        if current["p95_ms"] > limit:
+            failures.append(f"{name}: p95 {current['p95_ms']}ms > {limit:.2f}ms (baseline {previous['p95_ms']}ms)")
+    for name, previous in baseline.get("plans", {}).items():
+        current = report["plans"].get(name)
+        if current is None:
+            continue
+        seq_scan = "Seq Scan on measurements"
+        if seq_scan in current["nodes"] and seq_scan not in previous["nodes"]:
+            failures.append(f"{name}: plan now sequentially scans measurements ({' > '.join(current['nodes'])})")
+    return failures
+
+
+def _baseline_view(report: dict[str, Any]) -> dict[str, Any]:
+    return {
+        "latency": report["latency"],
+        "plans": {name: {"nodes": plan["nodes"]} for name, plan in report["plans"].items()},
+        "config": report["config"],
+    }
+
+
+async def run(args: argparse.Namespace) -> int:
+    sites = site_names(args.series)
+    plans = await capture_plans(args.database_url, sites[0])
+    latency = await drive_load(args.base_url, sites, clients=args.clients, duration=args.duration)
+    report = {
+        "generated_at": datetime.now(timezone.utc).isoformat(),
+        "config": {"clients": args.clients, "duration": args.duration, "series": args.series},
+        "latency": latency,
+        "plans": plans,
+    }
+
+    print(f"{'shape':<24}{'req':>8}{'err':>6}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}{'plan ms':>10}")
+    for name, stats in latency.items():
+        plan_ms = plans.get(name, {}).get("execution_ms")
+        print(
+            f"{name:<24}{stats['requests']:>8}{stats['errors']:>6}"
+            f"{stats.get('p50_ms', float('nan')):>10.2f}{stats.get('p95_ms', float('nan')):>10.2f}"
+            f"{stats.get('p99_ms', float('nan')):>10.2f}"
+            f"{plan_ms if plan_ms is not None else float('nan'):>10.2f}"
+        )
+    for name, plan in plans.items():
+        print(f"plan {name}: {' > '.join(plan['nodes'])}")
+
+    if args.report:
+        args.report.write_text(json.dumps(report, indent=2, default=str), encoding="utf-8")
+        print(f"wrote report to {args.report}")
+
+    failed = [name for name, stats in latency.items() if stats["errors"]]
+    if failed:
+        # Checked first: latencies of failing requests must never become the baseline.
+        print(f"some requests failed: {', '.join(failed)}")
+        return 1
+    if args.update_baseline:
+        args.baseline.write_text(json.dumps(_baseline_view(report), indent=2), encoding="utf-8")
+        print(f"updated baseline {args.baseline}")
+        return 0
+    if args.baseline:
+        if not args.baseline.exists():
+            print(f"baseline {args.baseline} not found; rerun with --update-baseline to create it")
+            return 1
+        baseline = json.loads(args.baseline.read_text(encoding="utf-8"))
+        failures = compare(report, baseline, tolerance=args.tolerance, slack_ms=args.slack_ms)
+        for failure in failures:
+            print(f"REGRESSION {failure}")
+        if failures:
+            return 1
+        print("no regressions against baseline")
+    return 0
+
+
+def main(argv: list[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    seed_parser = commands.add_parser("seed", help="fill a scratch database with synthetic series")
+    seed_parser.add_argument("--database-url", required=True)
+    seed_parser.add_argument("--rows", type=int, default=10_000_000)
+    seed_parser.add_argument("--series", type=int, default=50)
+    seed_parser.add_argument("--truncate", action="store_true", help="wipe existing measurements first")
+
+    run_parser = commands.add_parser("run", help="load the API and compare against a baseline")
+    run_parser.add_argument("--database-url", required=True, help="the database the API under test uses")
+    run_parser.add_argument("--base-url", default="http://localhost:8000")
+    run_parser.add_argument("--series", type=int, default=50, help="must match the seed")
+    run_parser.add_argument("--clients", type=int, default=20)
+    run_parser.add_argument("--duration", type=float, default=60.0)
+    run_parser.add_argument("--report", type=Path, default=Path("read_bench_report.json"))
+    run_parser.add_argument("--baseline", type=Path)
+    run_parser.add_argument(
+        "--update-baseline", action="store_true", help="write this run to --baseline if no request failed"
+    )
+    run_parser.add_argument("--tolerance", type=float, default=0.25, help="allowed relative p95 increase")
+    run_parser.add_argument("--slack-ms", type=float, default=2.0, help="absolute p95 slack for fast shapes")
+    args = parser.parse_args(argv)
+    if args.command == "run" and args.update_baseline and args.baseline is None:
+        parser.error("--update-baseline requires --baseline")
+
+    if args.command == "seed":
+        asyncio.run(seed(args.database_url, rows=args.rows, series=args.series, truncate=args.truncate))
+        return 0
+    return asyncio.run(run(args))
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,196 @@
+"""Re-ingest captured MQTT traffic through the real parser and writer pipeline.
+
+Usage::
+
+    python -m app.replay CAPTURE_OR_DIR... [--realtime] [--database-url DSN]
+                         [--output results.jsonl] [--baseline previous.jsonl]
+
+Messages go through `MQTTConsumer.ingest`, so parsing, limits and the write
+queue behave as in production; topic settings (outside temperature and window
+state topics, site prefix) are read from the same environment as the API.
+Without ``--database-url`` stored rows are only collected in memory; with it
+they are also inserted, so point it at a scratch database. ``--output`` saves
+the stored rows and ``--baseline`` diffs them against an earlier run, which
+makes a capture usable as a parser regression test.
+"""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+import json
+import sys
+import time
+from collections import Counter
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Any
+
+from .capture import capture_files, iter_capture
+from .config import Settings
+from .database import Database
+from .logging_setup import configure_logging
+from .message_parser import DEFAULT_SITE, configure_from_settings
+from .mqtt_consumer import MQTTConsumer
+from .rate_limit import IngestLimits
+
+
+class RecordingSink:
+    """Stands in for `Database` in the consumer, keeping every stored row."""
+
+    def __init__(self, db: Database | None = None, *, default_site: str = DEFAULT_SITE) -> None:
+        self._db = db
+        self._default_site = default_site
+        self.rows: list[dict[str, Any]] = []
+
+    @property
+    def ready(self) -> bool:
+        return self._db is None or self._db.ready
+
+    async def insert_measurement(
+        self, device_id: str, metric: str, value: float, payload: dict | None, site: str | None = None
+    ) -> dict[str, Any]:
+        site = site or self._default_site
+        if self._db is not None:
+            row = await self._db.insert_measurement(device_id, metric, value, payload, site)
+        else:
+            row = {
+                "id": len(self.rows) + 1,
+                "site": site,
+                "device_id": device_id,
+                "metric": metric,
+                "value": value,
+                "ts": datetime.now(timezone.utc),
+                "payload": payload,
+            }
+        self.rows.append(row)
+        return row
+
+
+def _result_key(row: dict[str, Any]) -> str:
+    # ids and insert timestamps differ between runs, so they are not part of the result.
+    return json.dumps(
+        {
+            "site": row["site"],
+            "device_id": row["device_id"],
+            "metric": row["metric"],
+            "value": row["value"],
+            "payload": row["payload"],
+        },
+        sort_keys=True,
+        default=str,
+    )
+
+
+def diff_results(baseline: list[str], current: list[str], *, limit: int = 20) -> tuple[int, int, list[str]]:
+    expected = Counter(baseline)
+    actual = Counter(current)
+    missing = expected - actual
+    extra = actual - expected
+    lines = [f"- {key}" for key in list(missing.elements())[:limit]]
+    lines += [f"+ {key}" for key in list(extra.elements())[:limit]]
+    return sum(missing.values()), sum(extra.values()), lines
+
+
+async def replay(
+    paths: list[Path],
+    *,
+    settings: Settings,
+    realtime: bool = False,
+    database_url: str | None = None,
+    limits: IngestLimits | None = None,
+) -> tuple[RecordingSink, dict[str, Any], float, int]:
+    configure_from_settings(settings)
+    db = None
+    if database_url:
+        db = Database(database_url, default_site=settings.default_site)
+        await db.connect()
+        await db.ensure_schema()
+    sink = RecordingSink(db, default_site=settings.default_site)
+    consumer = MQTTConsumer(
+        sink,  # type: ignore[arg-type]
+        host="replay",
+        port=0,
+        topic="#",
+        limits=limits,
+    )
+    await consumer.start(subscribe=False)
+
+    messages = 0
+    first_arrival: float | None = None
+    started = time.perf_counter()
+    try:
+        for path in paths:
+            for arrival_ts, topic, payload in iter_capture(path):
+                if realtime:
+                    if first_arrival is None:
+                        first_arrival = arrival_ts
+                    delay = (arrival_ts - first_arrival) - (time.perf_counter() - started)
+                    if delay > 0:
+                        await asyncio.sleep(delay)
+                await consumer.ingest(topic, payload, wait=True)
+                messages += 1
+        await consumer.drain()
+        elapsed = time.perf_counter() - started
+    finally:
+        await consumer.stop()
+        if db is not None:
+            await db.disconnect()
+    return sink, consumer.stats(), elapsed, messages
+
+
+def main(argv: list[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("captures", nargs="+", help="capture files or directories")
+    parser.add_argument("--realtime", action="store_true", help="preserve original inter-arrival timing")
+    parser.add_argument("--database-url", help="also insert into this (scratch) database")
+    parser.add_argument("--with-limits", action="store_true", help="apply the default ingest rate limits")
+    parser.add_argument("--output", type=Path, help="write stored rows as JSON lines")
+    parser.add_argument("--baseline", type=Path, help="diff stored rows against an earlier --output")
+    args = parser.parse_args(argv)
+
+    paths = capture_files(args.captures)
+    if not paths:
+        parser.error("no capture files found")
+    # At full speed the production token buckets would shed nearly everything.
+    limits = (
+        IngestLimits()
+        if args.with_limits
+        else IngestLimits(device_rate=0, topic_rate=0, global_rate=0, max_series=10**9)
+    )
+
+    # The database URL is only needed with --database-url; everything else comes from the environment.
+    settings = Settings(database_url=args.database_url or "")
+    # Plain text: these lines share stdout with the summary printed below.
+    configure_logging(settings.log_level, json_format=False)
+    sink, stats, elapsed, messages = asyncio.run(
+        replay(
+            paths,
+            settings=settings,
+            realtime=args.realtime,
+            database_url=args.database_url,
+            limits=limits,
+        )
+    )
+
+    rate = messages / elapsed if elapsed > 0 else float("inf")
+    print(f"replayed {messages} messages from {len(paths)} file(s) in {elapsed:.3f}s ({rate:,.0f} msg/s)")
+    print(f"stored {len(sink.rows)} rows; counters: {json.dumps(stats['counters'], sort_keys=True)}")
+
+    results = [_result_key(row) for row in sink.rows]
+    if args.output:
+        args.output.write_text("".join(f"{line}\n" for line in results), encoding="utf-8")
+        print(f"wrote results to {args.output}")
+    if args.baseline:
+        baseline = args.baseline.read_text(encoding="utf-8").splitlines()
+        missing, extra, lines = diff_results(baseline, results)
+        print(f"diff vs {args.baseline}: {missing} missing, {extra} new")
+        for line in lines:
+            print(line)
+        if missing or extra:
+            return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
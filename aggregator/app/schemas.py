@@ -4,6 +4,7 @@ from pydantic import BaseModel, Field
 
 class Measurement(BaseModel):
     id: int
+    site: str
     device_id: str
     metric: str
     value: float
@@ -19,3 +20,51 @@ class WindowState(BaseModel):
 
 class WindowCommand(BaseModel):
     state: int = Field(ge=0, le=1)
+
+
+class SubsystemReport(BaseModel):
+    state: str
+    required: bool
+    attempts: int
+    last_error: str | None = None
+    ready_after_seconds: float | None = None
+
+
+class ReadinessReport(BaseModel):
+    ready: bool
+    uptime_seconds: float
+    first_message_after_seconds: float | None = None
+    subsystems: dict[str, SubsystemReport]
+
+
+class AlignedSeries(BaseModel):
+    device_id: str
+    metric: str
+    values: list[float | None]
+
+
+class AlignedSeriesResponse(BaseModel):
+    bucket_seconds: int
+    fill: str
+    start: datetime
+    end: datetime
+    buckets: list[datetime]
+    series: list[AlignedSeries]
+
+
+class WindowStats(BaseModel):
+    count: int
+    mean: float | None = None
+    variance: float | None = None
+    stddev: float | None = None
+    min: float | None = None
+    max: float | None = None
+    slope_per_hour: float | None = Field(default=None, description="Least-squares trend, units per hour")
+
+
+class SeriesStats(BaseModel):
+    device_id: str
+    metric: str
+    last_value: float | None = None
+    last_ts: datetime | None = None
+    windows: dict[str, WindowStats]
@@ -0,0 +1,299 @@
+"""Streaming per-series summaries (Welford mean/variance, min/max, trend) kept in memory.
+
+Each series owns one ring of fixed-width time buckets per window (1h of
+1-minute buckets, 24h of 15-minute buckets). Buckets are stored column-wise in
+`array` objects so a series costs a few kilobytes regardless of ingest rate,
+and a window summary is a merge over at most a few dozen buckets.
+"""
+from __future__ import annotations
+
+import logging
+import math
+import time
+from array import array
+from collections import deque
+from datetime import datetime, timezone
+from typing import Any, Iterable
+
+logger = logging.getLogger(__name__)
+
+_WINDOWS: tuple[tuple[str, int, int], ...] = (
+    # name, bucket width in seconds, number of buckets
+    ("1h", 60, 60),
+    ("24h", 900, 96),
+)
+
+
+# Merged partial aggregate: (count, mean, m2, min, max, sum_t, sum_tt, sum_tv).
+_Totals = tuple[int, float, float, float, float, float, float, float]
+_EMPTY: _Totals = (0, 0.0, 0.0, math.inf, -math.inf, 0.0, 0.0, 0.0)
+
+
+def _combine(a: _Totals, b: _Totals) -> _Totals:
+    """Chan et al. pairwise merge of two partial aggregates."""
+
+    n_a, mean_a, m2_a, lo_a, hi_a, st_a, stt_a, stv_a = a
+    n_b, mean_b, m2_b, lo_b, hi_b, st_b, stt_b, stv_b = b
+    if n_b == 0:
+        return a
+    if n_a == 0:
+        return b
+    total = n_a + n_b
+    delta = mean_b - mean_a
+    return (
+        total,
+        mean_a + delta * n_b / total,
+        m2_a + m2_b + delta * delta * n_a * n_b / total,
+        min(lo_a, lo_b),
+        max(hi_a, hi_b),
+        st_a + st_b,
+        stt_a + stt_b,
+        stv_a + stv_b,
+    )
+
+
+class _Ring:
+    """Fixed-size ring of time buckets, each holding a mergeable partial aggregate.
+
+    The merge of every bucket except the newest is cached, so a summary costs
+    one pairwise merge until the window slides or a late row lands in an older bucket.
+    """
+
+    __slots__ = (
+        "width", "size", "epoch", "count", "mean", "m2", "min", "max", "st", "stt", "stv",
+        "_closed_newest", "_closed",
+    )
+
+    def __init__(self, width: int, size: int) -> None:
+        self.width = width
+        self.size = size
+        self.epoch = array("q", [-1]) * size
+        self.count = array("q", [0]) * size
+        self.mean = array("d", [0.0]) * size
+        self.m2 = array("d", [0.0]) * size
+        self.min = array("d", [0.0]) * size
+        self.max = array("d", [0.0]) * size
+        # Regression sums over (t, value) with t in seconds relative to the series origin.
+        self.st = array("d", [0.0]) * size
+        self.stt = array("d", [0.0]) * size
+        self.stv = array("d", [0.0]) * size
+        # Totals of the buckets before `_closed_newest` that are still inside its window.
+        self._closed_newest = -1
+        self._closed: _Totals | None = None
+
+    def _slot(self, ts: float) -> int | None:
+        bucket = int(ts // self.width)
+        slot = bucket % self.size
+        current = self.epoch[slot]
+        if current == bucket:
+            return slot
+        if current > bucket:
+            # Older than anything this ring still remembers.
+            return None
+        self.epoch[slot] = bucket
+        self.count[slot] = 0
+        self.mean[slot] = self.m2[slot] = 0.0
+        self.st[slot] = self.stt[slot] = self.stv[slot] = 0.0
+        return slot
+
+    def add(self, ts: float, t: float, n: int, mean: float, m2: float, lo: float, hi: float) -> None:
+        slot = self._slot(ts)
+        if slot is None:
+            return
+        if self.epoch[slot] < self._closed_newest:
+            self._closed = None
+        count = self.count[slot]
+        if count == 0:
+            self.min[slot] = lo
+            self.max[slot] = hi
+        else:
+            self.min[slot] = min(self.min[slot], lo)
+            self.max[slot] = max(self.max[slot], hi)
+        total = count + n
+        delta = mean - self.mean[slot]
+        self.mean[slot] += delta * n / total
+        self.m2[slot] += m2 + delta * delta * count * n / total
+        self.count[slot] = total
+        self.st[slot] += n * t
+        self.stt[slot] += n * t * t
+        self.stv[slot] += n * t * mean
+
+    def _bucket(self, slot: int) -> _Totals:
+        return (
+            self.count[slot],
+            self.mean[slot],
+            self.m2[slot],
+            self.min[slot],
+            self.max[slot],
+            self.st[slot],
+            self.stt[slot],
+            self.stv[slot],
+        )
+
+    def summary(self, now: float) -> dict[str, Any]:
+        newest = int(now // self.width)
+        if self._closed is None or self._closed_newest != newest:
+            oldest = newest - self.size + 1
+            closed = _EMPTY
+            for slot in range(self.size):
+                if self.count[slot] and oldest <= self.epoch[slot] < newest:
+                    closed = _combine(closed, self._bucket(slot))
+            self._closed = closed
+            self._closed_newest = newest
+        totals = self._closed
+        slot = newest % self.size
+        if self.epoch[slot] == newest and self.count[slot]:
+            totals = _combine(totals, self._bucket(slot))
+
+        n, mean, m2, lo, hi, st, stt, stv = totals
+        if n == 0:
+            return {"count": 0}
+        variance = m2 / n
+        slope = None
+        spread = stt - st * st / n
+        if n > 1 and spread > 1e-9:
+            slope = (stv - st * mean) / spread * 3600.0
+        return {
+            "count": n,
+            "mean": mean,
+            "variance": variance,
+            "stddev": math.sqrt(variance),
+            "min": lo,
+            "max": hi,
+            "slope_per_hour": slope,
+        }
+
+
+class _SeriesSummary:
+    __slots__ = ("origin", "rings", "last_value", "last_ts")
+
+    def __init__(self, origin: float) -> None:
+        self.origin = origin
+        self.rings = [_Ring(width, size) for _, width, size in _WINDOWS]
+        self.last_value: float | None = None
+        self.last_ts: float | None = None
+
+    def add(self, ts: float, n: int, mean: float, m2: float, lo: float, hi: float) -> None:
+        t = ts - self.origin
+        for ring in self.rings:
+            ring.add(ts, t, n, mean, m2, lo, hi)
+
+
+class SeriesStatsStore:
+    """Maintains streaming summaries per (site, device_id, metric), updated on every ingest."""
+
+    def __init__(self, *, max_pending: int = 100_000) -> None:
+        # site -> (device_id, metric) -> summary, so a request only touches its own site.
+        self._sites: dict[str, dict[tuple[str, str], _SeriesSummary]] = {}
+        self._max_pending = max_pending
+        # Rows seen while a rebuild is in flight; applied once the rollups are in.
+        self._pending: deque[dict[str, Any]] | None = None
+        self.pending_dropped = 0
+
+    def _get(self, site: str, device_id: str, metric: str, ts: float) -> _SeriesSummary:
+        series = self._sites.setdefault(site, {})
+        summary = series.get((device_id, metric))
+        if summary is None:
+            summary = _SeriesSummary(origin=ts)
+            series[(device_id, metric)] = summary
+        return summary
+
+    def begin_rebuild(self) -> None:
+        """Hold updates until `rebuild` so rows stored during the rollup query are not lost."""
+
+        if self._pending is None:
+            self._pending = deque(maxlen=self._max_pending)
+
+    def update(self, row: dict[str, Any]) -> None:
+        if self._pending is not None:
+            if len(self._pending) == self._pending.maxlen:
+                if not self.pending_dropped:
+                    logger.warning(
+                        "Series statistics rebuild still pending after %s rows; dropping the oldest",
+                        self._max_pending,
+                    )
+                self.pending_dropped += 1
+            self._pending.append(row)
+            return
+        self._apply(row)
+
+    def _apply(self, row: dict[str, Any]) -> None:
+        ts = _to_epoch(row["ts"])
+        value = float(row["value"])
+        summary = self._get(row["site"], row["device_id"], row["metric"], ts)
+        summary.add(ts, 1, value, 0.0, value, value)
+        if summary.last_ts is None or ts >= summary.last_ts:
+            summary.last_ts = ts
+            summary.last_value = value
+
+    def rebuild(self, rollups: Iterable[dict[str, Any]], *, cutoff: datetime | float | None = None) -> None:
+        """Replace state with pre-aggregated buckets (see `Database.fetch_rollups`).
+
+        Rows held since `begin_rebuild` are applied afterwards, except those before
+        `cutoff`, which the rollups already include.
+        """
+
+        self._sites = {}
+        for rollup in rollups:
+            ts = _to_epoch(rollup["bucket"])
+            summary = self._get(rollup["site"], rollup["device_id"], rollup["metric"], ts)
+            summary.add(
+                ts,
+                int(rollup["count"]),
+                float(rollup["mean"]),
+                float(rollup["m2"]),
+                float(rollup["min"]),
+                float(rollup["max"]),
+            )
+            if summary.last_ts is None or ts >= summary.last_ts:
+                summary.last_ts = ts
+                summary.last_value = float(rollup["last"])
+
+        pending, self._pending = self._pending, None
+        if self.pending_dropped:
+            logger.warning(
+                "%s rows stored during the statistics rebuild are missing from /stats", self.pending_dropped
+            )
+        if pending:
+            since = _to_epoch(cutoff) if cutoff is not None else -math.inf
+            for row in pending:
+                if _to_epoch(row["ts"]) >= since:
+                    self._apply(row)
+
+    def summaries(
+        self, *, site: str, device_id: str | None = None, metric: str | None = None, now: float | None = None
+    ) -> list[dict[str, Any]]:
+        if now is None:
+            now = time.time()
+        series = self._sites.get(site, {})
+        if device_id is not None and metric is not None:
+            summary = series.get((device_id, metric))
+            items = [((device_id, metric), summary)] if summary is not None else []
+        else:
+            items = [
+                (key, summary)
+                for key, summary in series.items()
+                if (device_id is None or key[0] == device_id) and (metric is None or key[1] == metric)
+            ]
+        return [_describe(key[0], key[1], summary, now) for key, summary in items]
+
+    def __len__(self) -> int:
+        return sum(len(series) for series in self._sites.values())
+
+
+def _describe(device_id: str, metric: str, summary: _SeriesSummary, now: float) -> dict[str, Any]:
+    return {
+        "device_id": device_id,
+        "metric": metric,
+        "last_value": summary.last_value,
+        "last_ts": (
+            datetime.fromtimestamp(summary.last_ts, timezone.utc) if summary.last_ts is not None else None
+        ),
+        "windows": {name: ring.summary(now) for (name, _, _), ring in zip(_WINDOWS, summary.rings)},
+    }
+
+
+def _to_epoch(value: datetime | float) -> float:
+    if isinstance(value, datetime):
+        return value.timestamp()
+    return float(value)
@@ -13,8 +13,9 @@ class WindowController:
         self._port = port
         self._topic = topic
 
-    async def publish_state(self, state: int) -> None:
+    async def publish_state(self, state: int, *, topic: str | None = None) -> None:
+        topic = topic or self._topic
         payload = b"1" if state >= 1 else b"0"
-        logger.info("Publishing window state=%s to topic=%s", payload.decode(), self._topic)
+        logger.info("Publishing window state=%s to topic=%s", payload.decode(), topic)
         async with Client(hostname=self._host, port=self._port) as client:
-            await client.publish(self._topic, payload, qos=1, retain=True)
\ No newline at end of file
+            await client.publish(topic, payload, qos=1, retain=True)
\ No newline at end of file
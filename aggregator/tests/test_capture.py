@@ -0,0 +1,15 @@
+from app.capture import CaptureWriter, capture_files, iter_capture
+
+
+def test_records_round_trip_across_rotated_files(tmp_path):
+    writer = CaptureWriter(tmp_path, max_bytes=64, max_files=100)
+    records = [(1000.0 + index, f"czujnik/{index}", b"21.%d" % index) for index in range(20)]
+    for record in records:
+        writer.write(*record)
+    writer.close()
+
+    files = capture_files([tmp_path])
+    assert len(files) > 1
+    assert [record for path in files for record in iter_capture(path)] == records
+    assert writer.stats() == {"records": 20, "dropped": 0, "pending": 0}
+
@@ -0,0 +1,89 @@
+import struct
+
+import pytest
+
+from app.codec import (
+    CodecError,
+    decode_block,
+    encode_block,
+    encode_rows,
+    encode_series,
+    iter_frames,
+    read_stream_site,
+)
+
+
+def _bits(values):
+    # NaN != NaN and 0.0 == -0.0, so compare the exact IEEE 754 encodings.
+    return [struct.pack(">d", value) for value in values]
+
+
+EDGE_TS = [0, 0, 1, -5, 2**40, 2**40 + 1]
+EDGE_VALUES = [0.0, -0.0, float("nan"), float("inf"), 1e300, 5e-324]
+
+
+@pytest.mark.parametrize("block_size", [1, 2, 1024])
+def test_edge_cases_round_trip(block_size):
+    timestamps: list[int] = []
+    values: list[float] = []
+    for block in encode_series(EDGE_TS, EDGE_VALUES, block_size=block_size):
+        block_ts, block_values = decode_block(block)
+        timestamps.extend(block_ts)
+        values.extend(block_values)
+    assert timestamps == EDGE_TS
+    assert _bits(values) == _bits(EDGE_VALUES)
+
+
+def test_single_point_block():
+    assert decode_block(encode_block([1_764_000_000_000], [21.5])) == ([1_764_000_000_000], [21.5])
+
+
+def test_repeated_values_and_regular_interval():
+    timestamps = [1_764_000_000_000 + 60_000 * index for index in range(500)]
+    values = [21.0] * 250 + [21.1, 21.2, 20.9, 21.0] * 62 + [22.0, 22.0]
+    block = encode_block(timestamps, values)
+    assert decode_block(block) == (timestamps, values)
+    assert len(block) < 4 * len(values)
+
+
+def test_encode_block_rejects_bad_input():
+    with pytest.raises(ValueError):
+        encode_block([], [])
+    with pytest.raises(ValueError):
+        encode_block([1, 2], [1.0])
+
+
+def test_truncated_block_raises():
+    block = encode_block([0, 1_000, 2_500], [1.0, 2.5, -3.75])
+    with pytest.raises(CodecError):
+        decode_block(block[:-1])
+    with pytest.raises(CodecError):
+        decode_block(block[:5])
+
+
+def test_stream_round_trip():
+    rows = [
+        {"device_id": "window-actuator", "metric": "window_closed", "ts": 1_000, "value": 1.0},
+        {"device_id": "window-actuator", "metric": "window_closed", "ts": 61_000, "value": 0.0},
+        {"device_id": "window-sensor", "metric": "temperature_inside", "ts": 2_000, "value": 21.4},
+    ]
+    data = encode_rows(rows, site="north", block_size=1)
+    assert read_stream_site(data) == "north"
+    assert list(iter_frames(data)) == [
+        ("window-actuator", "window_closed", [1_000, 61_000], [1.0, 0.0]),
+        ("window-sensor", "temperature_inside", [2_000], [21.4]),
+    ]
+
+
+def test_empty_stream_has_no_frames():
+    data = encode_rows([], site="default")
+    assert read_stream_site(data) == "default"
+    assert list(iter_frames(data)) == []
+
+
+def test_stream_errors():
+    with pytest.raises(CodecError):
+        list(iter_frames(b"JSON[]"))
+    data = encode_rows([{"device_id": "d", "metric": "m", "ts": 0, "value": 1.0}], site="s")
+    with pytest.raises(CodecError):
+        list(iter_frames(data[:-3]))
@@ -0,0 +1,41 @@
+import pytest
+
+from app.message_parser import DEFAULT_SITE, parse_mqtt_message, set_site_topic_prefix, split_site
+
+
+@pytest.fixture(autouse=True)
+def _reset_site_routing():
+    yield
+    set_site_topic_prefix("", default_site=DEFAULT_SITE)
+
+
+def test_site_routing_is_off_by_default():
+    assert split_site("cieplarnia/sensor-1/state") == (DEFAULT_SITE, "cieplarnia/sensor-1/state")
+
+
+def test_prefixed_topic_belongs_to_its_site():
+    set_site_topic_prefix("site")
+    assert split_site("site/polnoc/okno/stan") == ("polnoc", "okno/stan")
+    assert split_site("site/a+b/okno/stan") == (DEFAULT_SITE, "site/a+b/okno/stan")
+    assert split_site("okno/stan") == (DEFAULT_SITE, "okno/stan")
+
+
+def test_unknown_sites_fall_back_to_default_when_allowlisted():
+    set_site_topic_prefix("site", default_site="main", allowed_sites=["polnoc"])
+    assert split_site("site/polnoc/okno/stan") == ("polnoc", "okno/stan")
+    assert split_site("site/evil/okno/stan") == ("main", "site/evil/okno/stan")
+
+
+def test_invalid_site_configuration_is_rejected():
+    with pytest.raises(ValueError):
+        set_site_topic_prefix("site", default_site="a/b")
+    with pytest.raises(ValueError):
+        set_site_topic_prefix("site", allowed_sites=["#"])
+
+
+@pytest.mark.parametrize(
+    "payload",
+    [b'{"device_id": {"a": 1}, "value": 1}', b'{"metric": ["a"], "value": 1}', b'{"device_id": "", "value": 1}'],
+)
+def test_non_string_identifiers_are_rejected(payload):
+    assert parse_mqtt_message("sensors/json", payload) is None
@@ -0,0 +1,36 @@
+from app.rate_limit import KeyedRateLimiter, SeriesRegistry
+
+
+def test_burst_of_junk_series_does_not_lock_out_later_series():
+    registry = SeriesRegistry(max_series=3, idle_seconds=60)
+    for index in range(10):
+        registry.admit(("default", "junk", f"metric-{index}"), now=0)
+    assert len(registry) == 3
+
+    # While the junk is still fresh the cap holds...
+    assert not registry.admit(("default", "window-sensor", "temperature_inside"), now=30)
+    # ...but once it has been idle long enough its slots go to real series.
+    assert registry.admit(("default", "window-sensor", "temperature_inside"), now=61)
+    assert registry.admit(("default", "window-sensor", "temperature_outside"), now=62)
+
+
+def test_active_series_are_not_expired():
+    registry = SeriesRegistry(max_series=2, idle_seconds=60)
+    registry.admit("steady", now=0)
+    registry.admit("one-off", now=0)
+    for now in range(10, 200, 10):
+        assert registry.admit("steady", now=now)
+    assert registry.admit("newcomer", now=200)
+    assert not registry.admit("another", now=200)
+
+
+def test_rate_limiter_burst_then_refill():
+    limiter = KeyedRateLimiter(rate=1.0, burst=2)
+    assert [limiter.allow("topic", now=0) for _ in range(3)] == [True, True, False]
+    assert limiter.allow("topic", now=1.0)
+    assert limiter.allow("other", now=1.0)
+
+
+def test_rate_limiter_disabled_with_zero_rate():
+    limiter = KeyedRateLimiter(rate=0, burst=1)
+    assert all(limiter.allow("topic", now=0) for _ in range(100))
@@ -0,0 +1,58 @@
+import pytest
+
+pytest.importorskip("asyncpg")
+
+from app.message_parser import DEFAULT_SITE  # noqa: E402
+from app.read_bench import compare, percentile, series_layout  # noqa: E402
+
+
+def _report(p95_ms, nodes):
+    return {"latency": {"stats": {"p95_ms": p95_ms}}, "plans": {"measurements_24h": {"nodes": nodes}}}
+
+
+INDEX_SCAN = ["Limit", "Index Scan using measurements_site_series_ts_idx"]
+SEQ_SCAN = ["Limit", "Seq Scan on measurements"]
+
+
+def test_percentile_uses_the_nearest_rank():
+    samples = [float(value) for value in range(1, 101)]
+    assert percentile(samples, 0.5) == 50.0
+    assert percentile(samples, 0.95) == 95.0
+    assert percentile(samples, 1.0) == 100.0
+    assert percentile([7.0, 3.0], 0.0) == 3.0
+    assert percentile([4.0], 0.99) == 4.0
+
+
+def test_series_layout_fills_sites_in_order():
+    layout = series_layout(23)
+    assert len(layout) == len(set(layout)) == 23
+    assert [site for site, _, _ in layout[:10]] == [DEFAULT_SITE] * 10
+    assert {site for site, _, _ in layout[10:20]} == {"bench-01"}
+    assert {site for site, _, _ in layout[20:]} == {"bench-02"}
+    # Every site carries the series the dashboard reads.
+    assert layout[0][1:] == ("window-sensor", "temperature_inside")
+    assert layout[10][1:] == layout[0][1:]
+    assert series_layout(1) == [layout[0]]
+
+
+def test_compare_passes_within_tolerance_and_slack():
+    baseline = _report(100.0, INDEX_SCAN)
+    assert compare(_report(114.0, INDEX_SCAN), baseline, tolerance=0.1, slack_ms=5.0) == []
+
+
+def test_compare_flags_latency_regressions():
+    failures = compare(_report(116.0, INDEX_SCAN), _report(100.0, INDEX_SCAN), tolerance=0.1, slack_ms=5.0)
+    assert len(failures) == 1
+    assert failures[0].startswith("stats: p95 116.0ms > 115.00ms")
+
+
+def test_compare_flags_new_sequential_scans_only():
+    failures = compare(_report(100.0, SEQ_SCAN), _report(100.0, INDEX_SCAN), tolerance=0.1, slack_ms=5.0)
+    assert len(failures) == 1
+    assert failures[0].startswith("measurements_24h: plan now sequentially scans")
+    assert compare(_report(100.0, SEQ_SCAN), _report(100.0, SEQ_SCAN), tolerance=0.1, slack_ms=5.0) == []
+
+
+def test_compare_ignores_shapes_missing_from_the_report():
+    report = {"latency": {"stats": {"error": "boom"}}, "plans": {}}
+    assert compare(report, _report(100.0, INDEX_SCAN), tolerance=0.0, slack_ms=0.0) == []
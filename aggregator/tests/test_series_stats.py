@@ -0,0 +1,153 @@
+import random
+import statistics
+
+import pytest
+
+from app.series_stats import SeriesStatsStore
+
+NOW = 1_764_000_000.0
+HOUR_START = (NOW // 60 - 59) * 60  # oldest 1-minute bucket still inside the 1h window
+
+
+def _row(ts, value, *, site="default", device_id="window-sensor", metric="temperature_inside"):
+    return {"site": site, "device_id": device_id, "metric": metric, "ts": ts, "value": value}
+
+
+def _brute_force(points):
+    values = [value for _, value in points]
+    times = [ts for ts, _ in points]
+    mean_t = statistics.fmean(times)
+    mean_v = statistics.fmean(values)
+    slope = sum((t - mean_t) * (v - mean_v) for t, v in points) / sum((t - mean_t) ** 2 for t in times)
+    return {
+        "count": len(points),
+        "mean": mean_v,
+        "variance": statistics.pvariance(values),
+        "min": min(values),
+        "max": max(values),
+        "slope_per_hour": slope * 3600.0,
+    }
+
+
+def _assert_matches(window, expected, *, with_slope=True):
+    assert window["count"] == expected["count"]
+    assert window["min"] == expected["min"]
+    assert window["max"] == expected["max"]
+    assert window["mean"] == pytest.approx(expected["mean"], rel=1e-12)
+    assert window["variance"] == pytest.approx(expected["variance"], rel=1e-9)
+    if with_slope:
+        assert window["slope_per_hour"] == pytest.approx(expected["slope_per_hour"], rel=1e-6)
+
+
+def test_windows_match_brute_force():
+    rng = random.Random(3)
+    points = [(NOW - rng.uniform(0, 86_000), rng.gauss(20, 2)) for _ in range(2000)]
+    store = SeriesStatsStore()
+    for ts, value in points:
+        store.update(_row(ts, value))
+
+    (summary,) = store.summaries(site="default", now=NOW)
+    _assert_matches(summary["windows"]["1h"], _brute_force([p for p in points if p[0] >= HOUR_START]))
+    day_start = (NOW // 900 - 95) * 900
+    _assert_matches(summary["windows"]["24h"], _brute_force([p for p in points if p[0] >= day_start]))
+
+
+def test_slope_of_a_linear_trend():
+    store = SeriesStatsStore()
+    for minute in range(50):
+        store.update(_row(NOW - 60 * minute, 20.0 - 0.05 * minute))
+    window = store.summaries(site="default", now=NOW)[0]["windows"]["1h"]
+    # Value rises 0.05 per minute towards now, i.e. 3 per hour.
+    assert window["slope_per_hour"] == pytest.approx(3.0)
+    assert window["variance"] > 0
+
+
+def test_old_buckets_expire_from_the_window():
+    store = SeriesStatsStore()
+    store.update(_row(NOW - 30, 10.0))
+    store.update(_row(NOW - 1800, 30.0))
+    assert store.summaries(site="default", now=NOW)[0]["windows"]["1h"]["count"] == 2
+
+    later = NOW + 3600
+    window = store.summaries(site="default", now=later)[0]["windows"]["1h"]
+    assert window == {"count": 0}
+    assert store.summaries(site="default", now=later)[0]["windows"]["24h"]["count"] == 2
+
+
+def test_late_row_in_an_older_bucket_updates_the_cached_totals():
+    store = SeriesStatsStore()
+    store.update(_row(NOW - 5, 1.0))
+    store.update(_row(NOW - 600, 3.0))
+    assert store.summaries(site="default", now=NOW)[0]["windows"]["1h"]["mean"] == pytest.approx(2.0)
+    store.update(_row(NOW - 1200, 5.0))
+    assert store.summaries(site="default", now=NOW)[0]["windows"]["1h"]["mean"] == pytest.approx(3.0)
+
+
+def _rollups(rows):
+    """What Database.fetch_rollups returns for these rows, with 1-minute buckets."""
+
+    buckets = {}
+    for row in rows:
+        key = (row["site"], row["device_id"], row["metric"], row["ts"] // 60 * 60)
+        buckets.setdefault(key, []).append(row)
+    result = []
+    for (site, device_id, metric, bucket), bucket_rows in sorted(buckets.items(), key=lambda item: item[0][3]):
+        values = [row["value"] for row in bucket_rows]
+        result.append(
+            {
+                "site": site,
+                "device_id": device_id,
+                "metric": metric,
+                "bucket": bucket,
+                "count": len(values),
+                "mean": statistics.fmean(values),
+                "m2": statistics.pvariance(values) * len(values),
+                "min": min(values),
+                "max": max(values),
+                "last": max(bucket_rows, key=lambda row: row["ts"])["value"],
+            }
+        )
+    return result
+
+
+def test_rebuild_hands_off_rows_stored_during_the_rollup_query():
+    rng = random.Random(5)
+    cutoff = NOW - 120
+    before = [_row(NOW - rng.uniform(200, 3000), rng.gauss(20, 1)) for _ in range(300)]
+    after = [_row(cutoff + rng.uniform(0, 110), rng.gauss(20, 1)) for _ in range(20)]
+
+    store = SeriesStatsStore()
+    store.begin_rebuild()
+    # Writers stored some rows the rollup query also saw, and some after its cutoff.
+    for row in before[-50:] + after:
+        store.update(row)
+    assert len(store) == 0
+    store.rebuild(_rollups(before), cutoff=cutoff)
+
+    rows = before + after
+    window = store.summaries(site="default", now=NOW)[0]["windows"]["1h"]
+    _assert_matches(window, _brute_force([(row["ts"], row["value"]) for row in rows]), with_slope=False)
+    assert store.summaries(site="default", now=NOW)[0]["last_value"] == max(rows, key=lambda r: r["ts"])["value"]
+
+
+def test_rebuild_buffer_counts_dropped_rows():
+    store = SeriesStatsStore(max_pending=2)
+    store.begin_rebuild()
+    for index in range(5):
+        store.update(_row(NOW - index, float(index)))
+    store.rebuild([], cutoff=0)
+    assert store.pending_dropped == 3
+    assert store.summaries(site="default", now=NOW)[0]["windows"]["1h"]["count"] == 2
+
+
+def test_summaries_are_scoped_by_site_and_filters():
+    store = SeriesStatsStore()
+    store.update(_row(NOW, 1.0, site="north"))
+    store.update(_row(NOW, 2.0, site="north", metric="humidity"))
+    store.update(_row(NOW, 3.0, site="south"))
+    assert len(store) == 3
+    assert {s["metric"] for s in store.summaries(site="north", now=NOW)} == {"temperature_inside", "humidity"}
+    (only,) = store.summaries(site="north", device_id="window-sensor", metric="humidity", now=NOW)
+    assert only["last_value"] == 2.0
+    assert store.summaries(site="north", device_id="window-sensor", metric="missing", now=NOW) == []
+    assert store.summaries(site="west", now=NOW) == []
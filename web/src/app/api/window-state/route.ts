@@ -7,9 +7,13 @@ const API_BASE =
 
 const WINDOW_STATE_URL = `${API_BASE}/window-state`;
 
-async function proxyWindowState(method: "GET" | "POST", body?: unknown) {
+async function proxyWindowState(
+  method: "GET" | "POST",
+  search: string,
+  body?: unknown,
+) {
   try {
-    const response = await fetch(WINDOW_STATE_URL, {
+    const response = await fetch(`${WINDOW_STATE_URL}${search}`, {
       method,
       headers: body ? { "Content-Type": "application/json" } : undefined,
       body: body ? JSON.stringify(body) : undefined,
@@ -26,11 +30,11 @@ async function proxyWindowState(method: "GET" | "POST", body?: unknown) {
   }
 }
 
-export async function GET() {
-  return proxyWindowState("GET");
+export async function GET(request: NextRequest) {
+  return proxyWindowState("GET", request.nextUrl.search);
 }
 
 export async function POST(request: NextRequest) {
   const payload = await request.json();
-  return proxyWindowState("POST", payload);
+  return proxyWindowState("POST", request.nextUrl.search, payload);
 }
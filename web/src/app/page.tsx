@@ -3,7 +3,12 @@ import { RefreshCwIcon } from "lucide-react";
 import { MeasurementsDashboard } from "@/components/measurements-dashboard";
 import { Button } from "@/components/ui/button";
 import { ThemeToggle } from "@/components/theme-toggle";
-import type { Measurement } from "@/lib/measurements";
+import {
+  ALIGNED_TEMPERATURE_SERIES,
+  SITE,
+  type AlignedSeriesResponse,
+  type Measurement,
+} from "@/lib/measurements";
 
 const PUBLIC_API_BASE = process.env.NEXT_PUBLIC_API_BASE_URL ?? "http://localhost:8000";
 const INTERNAL_API_BASE = process.env.AGGREGATOR_API_BASE_URL ?? PUBLIC_API_BASE;
@@ -21,7 +26,7 @@ async function getMeasurements(): Promise<Measurement[]> {
   };
 
   try {
-    const params = new URLSearchParams({ hours: "24" });
+    const params = new URLSearchParams({ site: SITE, hours: "24" });
     const res = await fetch(`${INTERNAL_API_BASE}/measurements?${params.toString()}`, fetchOptions);
     if (!res.ok) {
       return [];
@@ -33,8 +38,29 @@ async function getMeasurements(): Promise<Measurement[]> {
   }
 }
 
+async function getAlignedTemperatures(): Promise<AlignedSeriesResponse | null> {
+  const fetchOptions: NextFetchRequestInit = {
+    next: { revalidate: 5 },
+  };
+
+  try {
+    const params = new URLSearchParams({ site: SITE, hours: "24", bucket_seconds: "300", fill: "locf" });
+    for (const spec of Object.values(ALIGNED_TEMPERATURE_SERIES)) {
+      params.append("series", spec);
+    }
+    const res = await fetch(`${INTERNAL_API_BASE}/series/aligned?${params.toString()}`, fetchOptions);
+    if (!res.ok) {
+      return null;
+    }
+    return res.json();
+  } catch (error) {
+    console.error("Failed to fetch aligned temperatures", error);
+    return null;
+  }
+}
+
 export default async function HomePage() {
-  const measurements = await getMeasurements();
+  const [measurements, alignedTemperatures] = await Promise.all([getMeasurements(), getAlignedTemperatures()]);
 
   return (
     <main className="min-h-dvh bg-slate-50 text-slate-900 transition-colors dark:bg-slate-950 dark:text-slate-100">
@@ -57,7 +83,7 @@ export default async function HomePage() {
             <ThemeToggle />
           </div>
         </header>
-        <MeasurementsDashboard measurements={measurements} />
+        <MeasurementsDashboard measurements={measurements} alignedTemperatures={alignedTemperatures} />
       </section>
     </main>
   );
@@ -21,10 +21,16 @@ import {
 
 import { Card, CardContent, CardDescription, CardHeader, CardTitle } from "@/components/ui/card";
 import { WindowControl } from "@/components/window-control";
-import type { Measurement } from "@/lib/measurements";
+import {
+  ALIGNED_TEMPERATURE_SERIES,
+  alignedColumn,
+  type AlignedSeriesResponse,
+  type Measurement,
+} from "@/lib/measurements";
 
 interface MeasurementsDashboardProps {
   measurements: Measurement[];
+  alignedTemperatures?: AlignedSeriesResponse | null;
 }
 
 interface TimelinePoint {
@@ -193,6 +199,36 @@ const transformMeasurements = (measurements: Measurement[]): TransformResult =>
   };
 };
 
+// Temperature lines and deltas from the server-side gap-filled matrix, so the
+// series share one time axis instead of being bucketed per minute in the browser.
+const alignedTemperatureSeries = (
+  aligned: AlignedSeriesResponse,
+): Pick<TransformResult, 'temperatureSeries' | 'deltaSeries'> => {
+  const inside = alignedColumn(aligned, ALIGNED_TEMPERATURE_SERIES.inside);
+  const outside = alignedColumn(aligned, ALIGNED_TEMPERATURE_SERIES.outside);
+  const ambient = alignedColumn(aligned, ALIGNED_TEMPERATURE_SERIES.ambient);
+
+  const temperatureSeries = aligned.buckets
+    .map((ts, index) => ({
+      ts,
+      label: formatTimeLabel(ts),
+      inside: inside?.[index] ?? null,
+      outside: outside?.[index] ?? null,
+      ambient: ambient?.[index] ?? null,
+    }))
+    .filter((point) => point.inside !== null || point.outside !== null || point.ambient !== null);
+
+  const deltaSeries = temperatureSeries
+    .filter((point) => point.outside !== null && point.ambient !== null)
+    .map((point) => ({
+      ts: point.ts,
+      label: point.label,
+      delta: (point.outside ?? 0) - (point.ambient ?? 0),
+    }));
+
+  return { temperatureSeries, deltaSeries };
+};
+
 const ChartTooltip = ({ active, payload, label }: TooltipProps<number, string>) => {
   if (!active || !payload?.length) {
     return null;
@@ -234,11 +270,11 @@ const WindowTooltip = ({ active, payload, label }: TooltipProps<number, string>)
   );
 };
 
-export function MeasurementsDashboard({ measurements }: MeasurementsDashboardProps) {
-  const { temperatureSeries, deltaSeries, windowSeries, stats } = useMemo(
-    () => transformMeasurements(measurements),
-    [measurements],
-  );
+export function MeasurementsDashboard({ measurements, alignedTemperatures }: MeasurementsDashboardProps) {
+  const { temperatureSeries, deltaSeries, windowSeries, stats } = useMemo(() => {
+    const result = transformMeasurements(measurements);
+    return alignedTemperatures ? { ...result, ...alignedTemperatureSeries(alignedTemperatures) } : result;
+  }, [measurements, alignedTemperatures]);
 
   const latestSamples = useMemo<LatestSamples>(() => {
     const newest = new Map<string, Measurement>();
@@ -5,9 +5,11 @@ import { useCallback, useEffect, useMemo, useState } from "react";
 
 import { Button } from "@/components/ui/button";
 import { Card, CardContent, CardDescription, CardHeader, CardTitle } from "@/components/ui/card";
+import { SITE } from "@/lib/measurements";
 
-const API_ENDPOINT = "/api/window-state";
-const LOCALHOST_ENDPOINT = "http://localhost:8000/window-state";
+const SITE_QUERY = `?site=${encodeURIComponent(SITE)}`;
+const API_ENDPOINT = `/api/window-state${SITE_QUERY}`;
+const LOCALHOST_ENDPOINT = `http://localhost:8000/window-state${SITE_QUERY}`;
 
 interface WindowStateResponse {
   state: number | null;
@@ -24,7 +26,7 @@ export function WindowControl({ className }: { className?: string }) {
   const requestWindowState = useCallback(
     async (method: 'GET' | 'POST', body?: Record<string, unknown>) => {
       const fallback = typeof window !== 'undefined'
-        ? `${window.location.protocol}//localhost:8000/window-state`
+        ? `${window.location.protocol}//localhost:8000/window-state${SITE_QUERY}`
         : LOCALHOST_ENDPOINT;
       const endpoints = method === 'GET' ? [API_ENDPOINT, fallback] : [API_ENDPOINT, fallback];
       let lastError: unknown = null;
@@ -1,12 +1,45 @@
+export const SITE = process.env.NEXT_PUBLIC_SITE ?? "default";
+
 export interface MeasurementPayload {
   [key: string]: unknown;
 }
 
 export interface Measurement {
   id: number;
+  site: string;
   device_id: string;
   metric: string;
   value: number;
   ts: string;
   payload?: MeasurementPayload | null;
 }
+
+export interface AlignedSeries {
+  device_id: string;
+  metric: string;
+  values: (number | null)[];
+}
+
+export interface AlignedSeriesResponse {
+  bucket_seconds: number;
+  fill: "none" | "locf" | "interpolate";
+  start: string;
+  end: string;
+  buckets: string[];
+  series: AlignedSeries[];
+}
+
+// device_id:metric pairs the temperature charts request from /series/aligned.
+export const ALIGNED_TEMPERATURE_SERIES = {
+  inside: "window-sensor:temperature_inside",
+  outside: "window-sensor:temperature_outside",
+  ambient: "weather-service:temperature_outside_ambient",
+} as const;
+
+export const alignedColumn = (
+  response: AlignedSeriesResponse,
+  spec: string,
+): (number | null)[] | undefined => {
+  const [deviceId, metric] = spec.split(":");
+  return response.series.find((series) => series.device_id === deviceId && series.metric === metric)?.values;
+};